@@ -0,0 +1,119 @@
+import time
+import uuid
+import threading
+import collections
+import concurrent.futures
+
+## Background runs of the Dash apps. Jobs run in a pool of worker processes, so that a long run
+## neither blocks the Flask worker serving the request nor the runs of other users.
+## Jobs is kept in the memory of the app process, so the apps are served by a single process.
+## Jobs only holds queued and running jobs: a finished job is moved to Results, and a job still
+## queued after Job_expiry seconds is cancelled and moved to Results as 'Expired'. A running job
+## cannot be stopped in its worker process, it is kept until it finishes.
+Workers = 4
+Pool = None
+Jobs = {}
+Job_expiry = 3600
+Lock = threading.Lock()
+
+## Final status (and outputs) of the finished jobs, kept for repeated polls and for server-side
+## paging of the results table. The least recently used results are dropped beyond Result_size entries.
+Result_size = 32
+Results = collections.OrderedDict()
+
+def Get_pool():
+    global Pool
+    with Lock:
+        if Pool is None:
+            Pool = concurrent.futures.ProcessPoolExecutor(Workers)
+    return Pool
+
+def Submit(func, *args):
+    '''
+    Submits func(*args) to the worker pool and returns the job id, to be kept in a dcc.Store.
+    func and its arguments are sent to a worker process, so they must be picklable
+    (module level functions, dataframes, dictionaries, ...).
+    '''
+    Collect_jobs()
+    JobID = uuid.uuid4().hex
+    Future = Get_pool().submit(func, *args)
+    with Lock:
+        Jobs[JobID] = {'Future' : Future, 'Start' : time.time()}
+    return JobID
+
+def Collect_jobs():
+    ## Moves every finished job and every expired queued job to Results, whether polled or not :
+    with Lock:
+        JobIDs = list(Jobs)
+    for JobID in JobIDs:
+        with Lock:
+            Job = Jobs.get(JobID)
+        if Job is None:
+            continue
+        if Job['Future'].done():
+            Finish_job(JobID, Job)
+        elif time.time()-Job['Start']>Job_expiry and Job['Future'].cancel():
+            Finish_job(JobID, Job)
+
+def Finish_job(JobID, Job):
+    Future, Seconds = Job['Future'], time.time()-Job['Start']
+    if Future.cancelled():
+        Finished = {'State' : 'Expired', 'Seconds' : Seconds, 'Result' : None, 'Error' : ''}
+    elif Future.exception() is not None:
+        Error = Future.exception()
+        Finished = {'State' : 'Failed', 'Seconds' : Seconds, 'Result' : None, 'Error' : '{}: {}'.format(type(Error).__name__, Error)}
+    else:
+        Finished = {'State' : 'Done', 'Seconds' : Seconds, 'Result' : Future.result(), 'Error' : ''}
+    with Lock:
+        ## A concurrent poll may have finished the job first, its status is then kept :
+        if JobID in Jobs:
+            Jobs.pop(JobID)
+            Keep_status(JobID, Finished)
+        return Results.get(JobID, Finished)
+
+def Status(JobID):
+    '''
+    Output: Dictionary of the job status, polled by dcc.Interval:
+            [1] State       'Unknown', 'Queued', 'Running', 'Done', 'Failed' or 'Expired'.
+            [2] Seconds     Time from submission (to completion, once finished).
+            [3] Result      Output of func once Done, else None.
+            [4] Error       Error message once Failed, else ''.
+    A finished job is moved from Jobs to Results, so that its status can be read again.
+    '''
+    with Lock:
+        if JobID in Results:
+            Results.move_to_end(JobID)
+            return Results[JobID]
+        Job = Jobs.get(JobID)
+    if Job is None:
+        return {'State' : 'Unknown', 'Seconds' : 0, 'Result' : None, 'Error' : ''}
+
+    Future = Job['Future']
+    if not Future.done():
+        State = 'Running' if Future.running() else 'Queued'
+        return {'State' : State, 'Seconds' : time.time()-Job['Start'], 'Result' : None, 'Error' : ''}
+    return Finish_job(JobID, Job)
+
+def Status_message(Job):
+    if Job['State'] in ['Queued', 'Running']:
+        return '{} ... {:.0f} s'.format(Job['State'], Job['Seconds'])
+    elif Job['State']=='Done':
+        return 'Completed in {:.1f} s'.format(Job['Seconds'])
+    elif Job['State']=='Failed':
+        return 'Run failed : {}'.format(Job['Error'])
+    elif Job['State']=='Expired':
+        return 'Run expired in the queue after {:.0f} s, please run again'.format(Job['Seconds'])
+    return 'Run not found, please run again'
+
+def Keep_status(JobID, Finished):
+    ## Called with Lock held :
+    Results[JobID] = Finished
+    while len(Results)>Result_size:
+        Results.popitem(last=False)
+
+def Get_result(JobID):
+    with Lock:
+        if JobID not in Results:
+            return None
+        Results.move_to_end(JobID)
+        return Results[JobID]['Result']
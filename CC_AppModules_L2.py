@@ -1,56 +1,103 @@
 import os
 import glob
-import base64
+import math
 import pandas as pd
 import dash_html_components as html
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 import dash_core_components as dcc
 import dash_bootstrap_components as dbc
-from dash.dependencies import Input, Output, State
+import dash
+import dash_table
+import CC_DataPrep as ccd
+import CC_AppJobs as ccj
+import CC_AppUploads as ccu
+from dash.dependencies import Input, Output, State, MATCH
 from CC_Master_L2 import Master
 
-def generate_table(df):
-    return html.Table(
-        [
-            html.Thead(
-                html.Tr([html.Th(col) for col in df.columns])
-            ),
-            html.Tbody([
-                html.Tr([
-                    html.Td(df.iloc[i][col]) for col in df.columns
-                ]) for i in range(len(df))
-            ])
-        ],
-        style={'margin': '50px',  'font-size': '12px', 'text-align':'center'}
-    )
+## Number of rows per page of the results table :
+Page_size = 25
 
-def generate_plot(df, y):
+## Time steps above which plots are downsampled and drawn with WebGL :
+Plot_points = 2000
 
-    x_scat, y_scat = df.index.values[1:], df[y].values[1:]
+## Upload file name endings and their Master file types :
+Upload_types = {'Inputs.xlsx':'Inputs.xlsx', 'Coolant.xlsx':'Coolant.xlsx', '.tab':'tab'}
 
-    layout = go.Layout(
-        plot_bgcolor="#FFF",
-        xaxis=dict(
-            title=df.index.name + ' ({})'.format(df.index.values[0]),
-            linecolor="#BCCCDC",
-            linewidth=2,
-            gridcolor="#BCCCDC",
-            zeroline = False
-        ),
-        yaxis=dict(
-            title=y + ' ({})'.format(df[y].values[0]),  
-            linecolor="#BCCCDC", 
-            linewidth=2,
-            gridcolor="#BCCCDC",
-            zeroline = False,
-        ),
-        height = 700,
-        font = dict(family= 'Cambria', size=15)
+def generate_table(df, job_id):
+    '''
+    Paginated results table: only the current page is sent to the browser, and page changes are
+    served by table_paging from the job outputs kept in CC_AppJobs. Units are shown under the
+    column names.
+    '''
+    Units = df.attrs.get('Units', {})
+    return dash_table.DataTable(
+        id={'type':'results-table', 'job':job_id},
+        columns=[{'name':[col, Units.get(col, '')], 'id':col} for col in df.columns],
+        data=table_page(df, 0, Page_size),
+        page_action='custom',
+        page_current=0,
+        page_size=Page_size,
+        page_count=math.ceil(len(df)/Page_size),
+        style_table={'padding': '50px', 'overflowX': 'auto'},
+        style_cell={'font-size': '12px', 'text-align':'center'}
     )
 
-    fig = go.Figure(
-        data = go.Scatter(x=x_scat, y=y_scat, marker_color='darkslategray', mode='lines+markers'),
-        layout = layout
+def table_page(df, page, size):
+    return df.iloc[page*size:(page+1)*size].to_dict('records')
+
+def table_paging(app):
+    @app.callback(
+        Output({'type':'results-table', 'job':MATCH}, 'data'),
+        [Input({'type':'results-table', 'job':MATCH}, 'page_current'), Input({'type':'results-table', 'job':MATCH}, 'page_size')],
+        [State({'type':'results-table', 'job':MATCH}, 'id')]
+    )
+    def _(page, size, table):
+        df = ccj.Get_result(table['job'])
+        if df is None:
+            return []
+        return table_page(df, page or 0, size)
+
+def generate_plot(df, y, max_points=None):
+    '''
+    y is a single output column, or a list of columns plotted one under the other over a shared
+    time axis. Above max_points (Plot_points by default) time steps, the series are downsampled
+    to a common selection of time steps (ccd.Downsample_Index, keeping the extrema) and drawn
+    with WebGL (Scattergl) lines.
+    '''
+    max_points = Plot_points if max_points is None else max_points
+    ys = [y] if isinstance(y, str) else list(y)
+    Units = df.attrs.get('Units', {})
+
+    index = ccd.Downsample_Index(df.index.values, [df[v].values for v in ys], max_points)
+    x_scat = df.index.values[index]
+    if len(df)>max_points:
+        Trace, mode = go.Scattergl, 'lines'
+    else:
+        Trace, mode = go.Scatter, 'lines+markers'
+
+    axis = dict(
+        linecolor="#BCCCDC",
+        linewidth=2,
+        gridcolor="#BCCCDC",
+        zeroline = False
+    )
+    fig = make_subplots(rows=len(ys), cols=1, shared_xaxes=True, vertical_spacing=0.05)
+    for row, v in enumerate(ys):
+        fig.add_trace(
+            Trace(x=x_scat, y=df[v].values[index], marker_color='darkslategray', mode=mode, name=v),
+            row=row+1, col=1
+        )
+        fig.update_yaxes(title=v + ' ({})'.format(Units.get(v, '')), row=row+1, col=1, **axis)
+        fig.update_xaxes(row=row+1, col=1, **axis)
+    fig.update_xaxes(
+        title=df.index.name + ' ({})'.format(Units.get(df.index.name, '')), row=len(ys), col=1
+    )
+    fig.update_layout(
+        plot_bgcolor="#FFF",
+        height = 700 if len(ys)==1 else 350*len(ys),
+        font = dict(family= 'Cambria', size=15),
+        showlegend = False
     )
     return fig
 
@@ -101,30 +148,40 @@ def input_parameters(index):
         ])
 
 def file_upload(app, files_upload, body):
+    '''
+    Uploaded files are parsed once (CC_AppUploads), and only their content keys are kept in the
+    session-files store of the browser session, by file type.
+    '''
     @app.callback(
-        Output(body, 'children'),
-        [Input(files_upload, 'filename'), Input(files_upload, 'contents')]
+        [Output('session-files', 'data'), Output(body, 'children')],
+        [Input(files_upload, 'filename'), Input(files_upload, 'contents')],
+        [State('session-files', 'data')]
     )
-    def file_upload(filenames, filecontents):
+    def file_upload(filenames, filecontents, session):
+        session, errors = dict(session or {}), []
         if filenames is not None and filecontents is not None:
             for name, content in zip(filenames, filecontents):
-                data = content.encode("utf8").split(b";base64,")[1]
-                with open(os.path.join('./temp', name), "wb") as fp:
-                    fp.write(base64.decodebytes(data))
+                try:
+                    upload = ccu.Add_upload(name, content, Upload_types)
+                    session[upload['Type']] = upload
+                except Exception as e:
+                    errors.append(html.Li(html.B('{} : {}'.format(name, e))))
 
-        files = []
-        for filename in os.listdir('./temp'):
-            path = os.path.join('./temp', filename)
-            if os.path.isfile(path):
-                files.append(filename)
-
-        if len(files)==0:
+        if len(session)==0:
             file_list = [
-                html.Content(html.B('No files yet! Please use "Select TAB, WAX, Dataset Files"'))
+                html.Content(html.B('No files yet! Please use "Select TAB & Dataset (Input & Coolant) Files"'))
             ]
         else:
-            file_list = [html.Li(html.I(file)) for file in files]
-        return file_list
+            file_list = [html.Li(html.I(session[ftype]['Name'])) for ftype in session]
+        return session, file_list + errors
+
+def get_uploads(session):
+    ## Parsed files of the session by file type, or None if any of them is missing :
+    session = session or {}
+    uploads = {ftype : ccu.Get_upload(session[ftype]['Key']) for ftype in session if ftype in Upload_types.values()}
+    if len(uploads)!=len(set(Upload_types.values())) or any(u is None for u in uploads.values()):
+        return None
+    return uploads
 
 def open_modal(app, modal, button_open, button_close):
     @app.callback(
@@ -137,61 +194,104 @@ def open_modal(app, modal, button_open, button_close):
             return not is_open
         return is_open
 
+def run_master(datafiles, tables, alpha_input, PIO):
+    ## Runs in a worker process of CC_AppJobs, only the outputs dataframe is sent back.
+    ## Concurrent jobs would write the same export file, it is downloaded by export_download instead :
+    return Master(datafiles, alpha_input, PIO, Tables=tables, Export=False).dfOutputs
+
+def generate_tabs(dfIO, alpha_input, job_id):
+    if alpha_input=='Alpha w':
+        Variables = ['ɑw','NuD','NuFD','Pro','Reo']
+    elif alpha_input=='Alpha c':
+        Variables = ['ɑc','NuD','NuFD','Prc','Rec']
+
+    fig = {
+        var: generate_plot(dfIO, var)
+        for var in Variables
+    }
+
+    child = {
+        **{'Results': [generate_table(dfIO, job_id)]},
+        **{
+            var: [
+                html.Div(dcc.Graph(figure=fig[var]))
+            ]
+            for var in fig
+        }
+    }
+
+    return [
+        dcc.Tab(child[c], label=c, value='tab-'+str(i+1), id='tab-'+str(i+1))
+        for i, c in enumerate(child)
+    ]
+
+def export_download(app):
+    '''
+    Download of the outputs of the current job, written on demand from the outputs kept in
+    CC_AppJobs, so that the runs of different users neither share nor leave files in ./output.
+    '''
+    @app.callback(
+        Output('download-results', 'data'),
+        [Input('download-button', 'n_clicks')],
+        [State('job-id', 'data')],
+        prevent_initial_call=True
+    )
+    def _(n, job):
+        df = ccj.Get_result(job['JobID']) if job and 'JobID' in job else None
+        if df is None:
+            return dash.no_update
+        return dcc.send_data_frame(
+            ccd.With_units(df).to_excel, 'Output DF Level 2 {}.xlsx'.format(job['Alpha'])
+        )
+
 def tabs_display(app):
+    '''
+    Run submits a background job (CC_AppJobs) and keeps its id in the job-id store. A new job id
+    enables job-poll, which polls the job status until the tabs can be rendered from its outputs.
+    '''
     @app.callback(
-        Output('tabs', 'children'),
+        Output('job-id', 'data'),
         [Input('run-button', 'n_clicks')],
         [
             State('input-0', 'value'),
-            State('input-1', 'value')
+            State('input-1', 'value'),
+            State('session-files', 'data')
         ]
     )
-    def _(run, PIO, alpha_input):
+    def _(run, PIO, alpha_input, session):
+        if not run:
+            return None
+
+        uploads = get_uploads(session)
+        if uploads is None:
+            return {'Error' : 'Please upload TAB & Dataset (Input & Coolant) files first'}
+
+        ## Already parsed tables are passed on to Master, instead of the files :
+        tables = {}
+        tables['P'], tables['TEMP'], tables['Properties'] = uploads['tab']
+        datafiles = {
+            'tab' : session['tab']['Name'],
+            'Inputs.xlsx' : uploads['Inputs.xlsx'],
+            'Coolant.xlsx' : uploads['Coolant.xlsx']
+        }
+
+        JobID = ccj.Submit(run_master, datafiles, tables, alpha_input, float(PIO))
+        return {'JobID' : JobID, 'Alpha' : alpha_input}
+
+    @app.callback(
+        [Output('tabs', 'children'), Output('job-status', 'children'), Output('job-poll', 'disabled')],
+        [Input('job-poll', 'n_intervals'), Input('job-id', 'data')]
+    )
+    def poll_run(n, job):
+        if not job:
+            return dash.no_update, '', True
+        if 'Error' in job:
+            return [], job['Error'], True
+
+        Job = ccj.Status(job['JobID'])
+        if Job['State'] in ['Queued', 'Running']:
+            return dash.no_update, ccj.Status_message(Job), False
         children = []
-        if run:
-
-            files = []
-            for filename in os.listdir('./temp'):
-                path = os.path.join('./temp', filename)
-                if os.path.isfile(path):
-                    files.append(filename)
-            datafiles = {
-                    ftype:'./temp/'+f 
-                    for ftype in ['tab','Inputs.xlsx','Coolant.xlsx'] 
-                    for f in files 
-                    if f.endswith(ftype)
-            }
-            if len(datafiles) == 3:
-                L2 = Master(
-                    datafiles, 
-                    alpha_input,
-                    float(PIO)
-                )
-                dfIO = L2.dfOutputs
-                if alpha_input=='Alpha w':
-                    Variables = ['ɑw','NuD','NuFD','Pro','Reo']
-                elif alpha_input=='Alpha c':
-                    Variables = ['ɑc','NuD','NuFD','Prc','Rec']
-
-                fig = {
-                    var: generate_plot(dfIO, var)
-                    for var in Variables
-                }
-
-                child = {
-                    **{'Results': [generate_table(dfIO)]},
-                    **{
-                        var: [
-                            html.Div(dcc.Graph(figure=fig[var]))
-                        ]
-                        for var in fig
-                    }
-                }
-
-                children = [
-                    dcc.Tab(child[c], label=c, value='tab-'+str(i+1), id='tab-'+str(i+1))
-                    for i, c in enumerate(child)
-                ]
-
-        return children
-                
+        if Job['State']=='Done':
+            children = generate_tabs(Job['Result'], job['Alpha'], job['JobID'])
+        return children, ccj.Status_message(Job), True
@@ -0,0 +1,61 @@
+import base64
+import hashlib
+import threading
+import collections
+import CC_DataPrep as ccd
+
+## Uploaded files of the Dash apps, parsed once on upload and kept in memory under the SHA-256
+## of their content. Each browser session only keeps the keys of its own files (dcc.Store), so
+## sessions never overwrite each other, and identical uploads share one parsed copy.
+## The least recently used entries are dropped beyond Upload_size entries.
+Upload_size = 64
+Uploads = collections.OrderedDict()
+Lock = threading.Lock()
+
+def File_type(filename, Types):
+    '''
+    Types maps the file name endings to the Master file types, e.g. {'.tab':'tab', ...}.
+    Returns None for a file name with none of the endings.
+    '''
+    for Ending, Type in Types.items():
+        if filename.endswith(Ending):
+            return Type
+    return None
+
+def Parser_type(Type):
+    ## Dataset files of any level are excel files :
+    return 'xlsx' if Type.endswith('xlsx') else Type
+
+def Add_upload(filename, content, Types):
+    '''
+    Decodes the base64 content of a dcc.Upload file and parses it once, unless the same content
+    is already in Uploads.
+
+    Output: Dictionary kept in the session store: file type, file name and content key.
+    '''
+    Type = File_type(filename, Types)
+    if Type is None:
+        raise ValueError('{} is not one of the expected {} files'.format(filename, ', '.join(Types)))
+    Data = base64.b64decode(content.split(',', 1)[1])
+    Key = hashlib.sha256(Data).hexdigest()
+    with Lock:
+        Found = Key in Uploads
+        if Found:
+            Uploads.move_to_end(Key)
+    if not Found:
+        Parsed = ccd.Get_Upload_Inputs(Data, Parser_type(Type))
+        with Lock:
+            Uploads[Key] = Parsed
+            while len(Uploads)>Upload_size:
+                Uploads.popitem(last=False)
+    return {'Type' : Type, 'Name' : filename, 'Key' : Key}
+
+def Get_upload(Key):
+    '''
+    Returns the parsed tables (or dataframe) of a content key, or None once it has been dropped.
+    '''
+    with Lock:
+        if Key not in Uploads:
+            return None
+        Uploads.move_to_end(Key)
+        return Uploads[Key]
@@ -0,0 +1,152 @@
+import os
+import time
+import argparse
+import concurrent.futures
+import pandas as pd
+import CC_DataPrep as ccd
+import CC_Master_L1 as ccm1
+import CC_Master_L2 as ccm2
+
+## Manifest columns holding input file paths, for Level 1 and Level 2 cases :
+File_columns = {
+    1 : ['tab', 'wax', 'xlsx'],
+    2 : ['tab', 'Inputs.xlsx', 'Coolant.xlsx']
+}
+## Optional manifest columns passed on to Master, for Level 1 and Level 2 cases :
+Parameter_columns = {
+    1 : ccm1.Sweep_parameters + ['Engine'],
+    2 : ['Alpha_input', 'PIO', 'Engine']
+}
+
+## Tables already loaded by the current worker process, keyed by (level, TAB path, WAX path) :
+Worker_tables = {}
+
+def Read_manifest(filepath):
+    '''
+    Manifest is a csv or excel file with one row per case:
+        [1] Case        Unique case name.
+        [2] Level       1 or 2.
+        [3] Files       Columns of File_columns for the case level. Relative paths are taken
+                        from the manifest folder.
+        [4] Parameters  Any of Parameter_columns, left empty to use the Master defaults.
+    '''
+    if filepath.endswith('.csv'):
+        dfManifest = pd.read_csv(filepath)
+    else:
+        dfManifest = pd.read_excel(filepath)
+    if dfManifest['Case'].duplicated().any():
+        raise ValueError('Duplicated case names in {}'.format(filepath))
+
+    Folder = os.path.dirname(os.path.abspath(filepath))
+    Cases = []
+    for Row in dfManifest.to_dict('records'):
+        Level = int(Row['Level'])
+        Cases.append({
+            'Case' : str(Row['Case']),
+            'Level' : Level,
+            'Files' : {
+                col : os.path.join(Folder, Row[col])
+                for col in File_columns[Level]
+            },
+            'Parameters' : {
+                col : Row[col]
+                for col in Parameter_columns[Level]
+                if col in Row and not pd.isna(Row[col])
+            }
+        })
+    return Cases
+
+def Run_case(Case):
+    '''
+    Runs a single manifest case in a worker process. TAB and WAX tables are loaded once per
+    worker, and passed on to every later case using the same files.
+
+    Output: Dictionary of the case dfOutputs (None if the case failed) and its timing.
+    '''
+    Start = time.perf_counter()
+    Level, Files = Case['Level'], Case['Files']
+    Key = (Level, Files['tab'], Files.get('wax'))
+    try:
+        if Level==1:
+            Run = ccm1.Master(Files, Tables=Worker_tables.get(Key), **Case['Parameters'])
+        else:
+            Run = ccm2.Master(Files, Tables=Worker_tables.get(Key), Export=False, **Case['Parameters'])
+        Worker_tables[Key] = Run.Table
+        dfOutputs, Error = Run.dfOutputs, ''
+    except Exception as e:
+        dfOutputs, Error = None, '{}: {}'.format(type(e).__name__, e)
+    return {
+        'Case' : Case['Case'],
+        'Level' : Level,
+        'dfOutputs' : dfOutputs,
+        'Seconds' : time.perf_counter()-Start,
+        'Worker' : os.getpid(),
+        'Error' : Error
+    }
+
+def Run_batch(Cases, Workers=None):
+    '''
+    Fans the cases out over a ProcessPoolExecutor of Workers processes (os.cpu_count() by default).
+    Cases are submitted grouped by their TAB and WAX files, so that each worker mostly reuses
+    the tables it already loaded.
+
+    Output: Two (2) dataframes, both with the cases in manifest order:
+            [1] dfResults   Long format outputs of every successful case: Case, Level, TIME and
+                            the output symbols of each level (units in dfResults.attrs['Units']).
+            [2] dfTiming    One row per case: wall time in seconds, worker process id and error.
+    '''
+    ## Results are returned in manifest order, whatever the submission order :
+    Order = {Case['Case'] : i for i, Case in enumerate(Cases)}
+    Cases = sorted(Cases, key=lambda Case: (Case['Files']['tab'], Case['Files'].get('wax', '')))
+    with concurrent.futures.ProcessPoolExecutor(Workers) as Pool:
+        Results = list(Pool.map(Run_case, Cases))
+
+    Results.sort(key=lambda Result: Order[Result['Case']])
+    Frames, Units = [], {}
+    for Result in Results:
+        if Result['dfOutputs'] is None:
+            continue
+        Units.update(Result['dfOutputs'].attrs['Units'])
+        dfCase = Result['dfOutputs'].reset_index()
+        dfCase.insert(0, 'Level', Result['Level'])
+        dfCase.insert(0, 'Case', Result['Case'])
+        Frames.append(dfCase)
+    dfResults = pd.concat(Frames, ignore_index=True) if Frames else pd.DataFrame(columns=['Case','Level','TIME'])
+    dfResults.attrs['Units'] = Units
+
+    dfTiming = pd.DataFrame(
+        [{col : Result[col] for col in ['Case','Level','Seconds','Worker','Error']} for Result in Results]
+    )
+    return dfResults, dfTiming
+
+def Save_batch(dfResults, dfTiming, filepath):
+    '''
+    Consolidated results are saved in filepath (csv or excel, with the units as first row),
+    and the per-case timing next to it with ' timing' appended to the file name.
+    '''
+    Root, Extension = os.path.splitext(filepath)
+    os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+    TimingPath = '{} timing{}'.format(Root, Extension)
+    if Extension=='.csv':
+        ccd.With_units(dfResults).to_csv(filepath, index=False)
+        dfTiming.to_csv(TimingPath, index=False)
+    else:
+        ccd.With_units(dfResults).to_excel(filepath, index=False)
+        dfTiming.to_excel(TimingPath, index=False)
+    return filepath, TimingPath
+
+
+if __name__ == '__main__':
+
+    Parser = argparse.ArgumentParser(description='Runs the Level 1 / Level 2 cases of a manifest file.')
+    Parser.add_argument('manifest', help='csv or excel manifest, one row per case')
+    Parser.add_argument('-o', '--output', default='./output/Batch results.csv', help='consolidated results file')
+    Parser.add_argument('-w', '--workers', type=int, default=None, help='number of worker processes')
+    Args = Parser.parse_args()
+
+    dfResults, dfTiming = Run_batch(Read_manifest(Args.manifest), Args.workers)
+    for Path in Save_batch(dfResults, dfTiming, Args.output):
+        print('Saved {}'.format(Path))
+    print('{} cases : {} failed | total {:.2f} s | longest {:.2f} s'.format(
+        len(dfTiming), int((dfTiming['Error']!='').sum()), dfTiming['Seconds'].sum(), dfTiming['Seconds'].max()
+    ))
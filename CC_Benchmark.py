@@ -0,0 +1,518 @@
+import time
+import tracemalloc
+import numpy as np
+from scipy.interpolate import griddata
+import pandas as pd
+import CC_DataPrep as ccd
+import CC_Kernels as cck
+import CC_Master_L1 as ccm1
+import CC_Master_Coupled as ccmc
+
+Files = {
+    'tab':'./Files/Dead Oil - Dulang 44 to 35C - OLGA tab - fixed format.tab',
+    'wax':'./Files/Dead Oil - DULANG 44 to 35C - OLGA WAX.wax',
+    'xlsx':'./Files/Dataset Level 1.xlsx'
+}
+
+def Timeit(func, *args, Repeat=5):
+    '''
+    Returns the best wall time (in ms) out of several repeats, together with the
+    output of the last call.
+    '''
+    Best = np.inf
+    for _ in range(Repeat):
+        Start = time.perf_counter()
+        Output = func(*args)
+        Best = min(Best, time.perf_counter()-Start)
+    return Best*1000, Output
+
+def Legacy_TAB_Properties(TextLines):
+    '''
+    Previous line by line TAB parser (3 tiers of nested dictionaries keyed 1 to 50),
+    kept here only as the reference for the parse-time benchmark.
+    '''
+    Property_pointer = {
+        PROP : i+1
+        for i, Line in enumerate(TextLines)
+        for PROP in [
+            'DENSITY','VISCOSITY',
+            'HEAT CAPACITY','THERMAL CONDUCTIVITY'
+        ]
+        if 'LIQUID '+PROP in Line
+    }
+    Abbrev = {
+        'DENSITY' : 'RHOOW',
+        'VISCOSITY' : 'UOW',
+        'HEAT CAPACITY' : 'CPOW',
+        'THERMAL CONDUCTIVITY' : 'KOW'
+    }
+    T1 = {}
+    for PROP in Property_pointer:
+        Line_init, T2 = Property_pointer[PROP], {}
+        for i in range(50):
+            T3, Count = {}, 1
+            for n in np.arange(Line_init, Line_init+10):
+                for value in ccd.SplitTextLine(TextLines[n]):
+                    T3[Count] = value
+                    Count += 1
+            T2[i+1] = T3
+            Line_init += 10
+        T1[Abbrev[PROP]] = T2
+    return T1
+
+def Legacy_WAX_Properties(TextLines):
+    '''
+    Previous WAX parser (T1/T2/T3 dictionaries of per-point lists, reshuffled into
+    N1/N2/N3), kept here only as the reference for the parse benchmark.
+    '''
+    Segment_pointer = [
+        i
+        for i, Line in enumerate(TextLines)
+        if '!Pressure Point No.' in Line
+    ]
+    Property_pointer = {'Wax Concs' : np.arange(0,47), 'Dens' : 47, 'Liq MW' : 49, 'Wax MW' : 50}
+    Abbrev = {'Wax Concs' : 'CWAX', 'Dens' : 'RHOWW', 'Liq MW' : 'MWOW', 'Wax MW' : 'MWWW'}
+    T1 = {}
+    for i in range(30):
+        T2 = {}
+        Line_init = Segment_pointer[i]
+        for j in range(30):
+            Linenum = Line_init+4+(9*j)
+            Values_ij, T3 = [], {}
+            for n in np.arange(Linenum, Linenum+8):
+                for value in ccd.SplitTextLine(TextLines[n]):
+                    Values_ij.append(value)
+            for PROP in Property_pointer:
+                Value_index = Property_pointer[PROP]
+                if isinstance(Value_index,int):
+                    T3[PROP] = Values_ij[Value_index]
+                else:
+                    T3[PROP] = [Values_ij[v] for v in Value_index]
+            T2[j+1] = T3
+        T1[i+1] = T2
+    N1 = {}
+    for PROP in Property_pointer:
+        N2 = {}
+        for i in range(30):
+            N3 = {}
+            for j in range(30):
+                N3[j+1] = T1[i+1][j+1][PROP]
+            N2[i+1] = N3
+        N1[Abbrev[PROP]] = N2
+    return N1
+
+def Memory(func, *args):
+    '''
+    Returns the memory (in MB) still held by the output of func, and the peak memory
+    allocated while func is running.
+    '''
+    tracemalloc.start()
+    Output = func(*args)
+    Held, Peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del Output
+    return Held/1E6, Peak/1E6
+
+def Bench_TAB_Parser():
+    TextLines = ccd.LoadTextFiles(Files['tab'])
+    Legacy_ms, Legacy = Timeit(Legacy_TAB_Properties, TextLines)
+    Array_ms, Array = Timeit(ccd.LookFor_Properties, TextLines, 'tab')
+
+    ## Both parsers must agree on every property value :
+    for PROP in Legacy:
+        Dense = np.array([[Legacy[PROP][i][j] for j in Legacy[PROP][i]] for i in Legacy[PROP]])
+        assert np.array_equal(Dense, Array[PROP]), PROP
+
+    print('TAB properties parse : dict {:.2f} ms | array {:.2f} ms | x{:.1f}'.format(
+        Legacy_ms, Array_ms, Legacy_ms/Array_ms
+    ))
+
+def Bench_WAX_Parser():
+    TextLines = ccd.LoadTextFiles(Files['wax'])
+    Legacy_ms, Legacy = Timeit(Legacy_WAX_Properties, TextLines)
+    Array_ms, Array = Timeit(ccd.LookFor_Properties, TextLines, 'wax')
+
+    for PROP in Legacy:
+        Dense = np.array([[Legacy[PROP][i][j] for j in Legacy[PROP][i]] for i in Legacy[PROP]])
+        assert np.array_equal(Dense, Array[PROP]), PROP
+
+    print('WAX properties parse : dict {:.2f} ms | array {:.2f} ms | x{:.1f}'.format(
+        Legacy_ms, Array_ms, Legacy_ms/Array_ms
+    ))
+    print('WAX properties memory (held/peak) : dict {:.2f}/{:.2f} MB | array {:.2f}/{:.2f} MB'.format(
+        *Memory(Legacy_WAX_Properties, TextLines),
+        *Memory(ccd.LookFor_Properties, TextLines, 'wax')
+    ))
+
+def Bench_Cache():
+    for filetype in ['tab','wax']:
+        Parse_ms, _ = Timeit(ccd.Get_File_Inputs, Files[filetype], filetype, False)
+        ccd.Get_File_Inputs(Files[filetype], filetype)
+        Cache_ms, _ = Timeit(ccd.Get_File_Inputs, Files[filetype], filetype)
+        Mmap_ms, _ = Timeit(ccd.Get_File_Inputs, Files[filetype], filetype, True, True)
+        print('{} Get_File_Inputs : parse {:.2f} ms | cached {:.2f} ms | memmap {:.2f} ms'.format(
+            filetype.upper(), Parse_ms, Cache_ms, Mmap_ms
+        ))
+
+def Legacy_Interp_Cell(PropertyTable, PIndex, TIndex):
+    '''
+    Previous griddata interpolation of Interp_Property(..., Both=True).
+    '''
+    Points = [
+        [P,T]
+        for P in [np.floor(PIndex), np.ceil(PIndex)]
+        for T in [np.floor(TIndex), np.ceil(TIndex)]
+    ]
+    Values = [
+        PropertyTable[int(P)][int(T)]
+        for P in [np.floor(PIndex), np.ceil(PIndex)]
+        for T in [np.floor(TIndex), np.ceil(TIndex)]
+    ]
+    return griddata(Points, Values, [PIndex, TIndex], method='linear')[0]
+
+def Bench_Interp_Cell(N=2000):
+    '''
+    Regression check of Interp_Cell and Interp_Cells against griddata on random
+    (P, T) indices inside the TAB and WAX tables, followed by the timings.
+    '''
+    Rng = np.random.default_rng(0)
+    for filetype, PROP in [('tab','UOW'), ('wax','MWWW')]:
+        _, _, Properties = ccd.Get_File_Inputs(Files[filetype], filetype, False)
+        Table = Properties[PROP]
+        PIndex = Rng.uniform(0, Table.shape[0]-1, N)
+        TIndex = Rng.uniform(0, Table.shape[1]-1, N)
+
+        Legacy_ms, Legacy = Timeit(
+            lambda: np.array([Legacy_Interp_Cell(Table, p, t) for p, t in zip(PIndex, TIndex)]), Repeat=1
+        )
+        Scalar_ms, Scalar = Timeit(
+            lambda: np.array([ccd.Interp_Cell(Table, p, t) for p, t in zip(PIndex, TIndex)])
+        )
+        Batch_ms, Batch = Timeit(ccd.Interp_Cells, Table, PIndex, TIndex)
+        assert np.allclose(Scalar, Legacy, rtol=1E-12, atol=0), PROP
+        assert np.allclose(Batch, Legacy, rtol=1E-12, atol=0), PROP
+
+        print('{} {} x{} cell interpolation : griddata {:.1f} ms | scalar {:.2f} ms | batch {:.3f} ms'.format(
+            filetype.upper(), PROP, N, Legacy_ms, Scalar_ms, Batch_ms
+        ))
+
+def Bench_Get_Properties():
+    '''
+    Property lookups of the whole Level 1 time series at Pio : one Get_Property call per
+    time step and property, against a single Get_Properties call.
+    '''
+    P_TAB, T_TAB, TAB = ccd.Get_File_Inputs(Files['tab'], 'tab', False)
+    P_WAX, T_WAX, WAX = ccd.Get_File_Inputs(Files['wax'], 'wax', False)
+    TW = ccd.Get_File_Inputs(Files['xlsx'], 'xlsx')['Tw'].to_numpy()
+    PIO = 101325
+    Lookups = [
+        (P_TAB, T_TAB, TAB, ['RHOOW','UOW','CPOW','KOW']),
+        (P_WAX, T_WAX, WAX, ['MWWW','MWOW','RHOWW'])
+    ]
+
+    def Loop():
+        return np.hstack([
+            np.array([
+                [
+                    ccd.Get_Property(
+                        ccd.P_TEMP_Index(P_Table, PIO), ccd.P_TEMP_Index(T_Table, Tw), Table[Name]
+                    )
+                    for Name in Names
+                ]
+                for Tw in TW
+            ])
+            for P_Table, T_Table, Table, Names in Lookups
+        ])
+
+    def Batch():
+        return np.hstack([
+            ccd.Get_Properties(PIO, TW, P_Table, T_Table, Table, Names)
+            for P_Table, T_Table, Table, Names in Lookups
+        ])
+
+    Loop_ms, Loop_out = Timeit(Loop)
+    Batch_ms, Batch_out = Timeit(Batch)
+    assert np.allclose(Loop_out, Batch_out, rtol=1E-12, atol=0)
+    print('Get_Property x{} lookups : loop {:.2f} ms | Get_Properties {:.3f} ms'.format(
+        Loop_out.size, Loop_ms, Batch_ms
+    ))
+
+def Legacy_Find_DC_DT(P_Index, TEMP_Index, TEMP_Table, CWAX_Table, CWAX_Feed):
+    '''
+    Previous Find_DC_DT, summing the 47 wax component concentrations on every call.
+    '''
+    [PIndex, PExact] = P_Index
+    [TIndex, TExact] = TEMP_Index
+    if TExact:
+        LowerT = TIndex-1 if TIndex-1>0 else 0
+        UpperT = TIndex+1 if TIndex+1<len(TEMP_Table) else len(TEMP_Table)-1
+    else:
+        LowerT = int(np.floor(TIndex))
+        UpperT = int(np.ceil(TIndex))
+    if PExact:
+        CWAX_LowerT = CWAX_Table[PIndex, LowerT].sum()
+        CWAX_UpperT = CWAX_Table[PIndex, UpperT].sum()
+    else:
+        CWAX_LowerT = ccd.Interp_Property(CWAX_Table[:, LowerT].sum(axis=1), PIndex)
+        CWAX_UpperT = ccd.Interp_Property(CWAX_Table[:, UpperT].sum(axis=1), PIndex)
+    return abs(((CWAX_Feed - CWAX_UpperT) - (CWAX_Feed - CWAX_LowerT)) / (TEMP_Table[LowerT] - TEMP_Table[UpperT]))
+
+def Bench_Find_DC_DT(N=2000):
+    '''
+    dC/dT at random (P, Tw) inside the WAX table, plus every exact grid point : previous
+    per-call summation, precomputed scalar lookups, and one Find_DC_DTs call.
+    '''
+    Rng = np.random.default_rng(0)
+    P_WAX, T_WAX, WAX = ccd.Get_File_Inputs(Files['wax'], 'wax', False)
+    P = np.concatenate([Rng.uniform(P_WAX[0], P_WAX[-1], N), np.repeat(P_WAX, len(T_WAX))])
+    TW = np.concatenate([Rng.uniform(T_WAX.min(), T_WAX.max(), N), np.tile(T_WAX, len(P_WAX))])
+    Indices = [(ccd.P_TEMP_Index(P_WAX, p), ccd.P_TEMP_Index(T_WAX, t)) for p, t in zip(P, TW)]
+    Feed = WAX['CWAXFEED'].sum()
+
+    Legacy_ms, Legacy = Timeit(
+        lambda: np.array([Legacy_Find_DC_DT(p, t, T_WAX, WAX['CWAX'], Feed) for p, t in Indices]), Repeat=1
+    )
+    Scalar_ms, Scalar = Timeit(lambda: np.array([ccd.Find_DC_DT(p, t, WAX) for p, t in Indices]))
+    Batch_ms, Batch = Timeit(ccd.Find_DC_DTs, P, TW, P_WAX, T_WAX, WAX)
+    assert np.allclose(Scalar, Legacy, rtol=1E-9, atol=0)
+    assert np.allclose(Batch, Legacy, rtol=1E-9, atol=0)
+    print('Find_DC_DT x{} : summing {:.1f} ms | precomputed {:.2f} ms | batch {:.3f} ms'.format(
+        len(P), Legacy_ms, Scalar_ms, Batch_ms
+    ))
+
+def Long_Inputs(Repeat):
+    '''
+    Long Level 1 input dataset: the bundled 300-minute Tw, dw and dT/dr series repeated
+    Repeat times, still at 10-minute time steps.
+    '''
+    dfInputs = ccd.Get_File_Inputs(Files['xlsx'], 'xlsx')
+    dfLong = pd.concat([dfInputs]*Repeat, ignore_index=True)
+    dfLong.index = dfLong.index*10
+    dfLong.index.name = dfInputs.index.name
+    return dfLong
+
+def Bench_L1_Engine(Repeat=50):
+    LongFiles = {**Files, 'xlsx':Long_Inputs(Repeat)}
+    Loop_ms, Loop = Timeit(lambda: ccm1.Master(LongFiles, Engine='Loop'), Repeat=1)
+    Vector_ms, Vector = Timeit(lambda: ccm1.Master(LongFiles, Engine='Vector'), Repeat=1)
+
+    pd.testing.assert_frame_equal(Loop.dfOutputs, Vector.dfOutputs)
+    assert Loop.Val['DELTA']==Vector.Val['DELTA'][-1]
+    print('L1 Master x{} time steps : Loop {:.0f} ms | Vector {:.0f} ms | x{:.1f}'.format(
+        len(LongFiles['xlsx']), Loop_ms, Vector_ms, Loop_ms/Vector_ms
+    ))
+
+def Bench_L1_Sweep():
+    '''
+    Full grid of 216 parameter sets : one Master per set, against a single Sweep.
+    '''
+    Grid = ccm1.Sweep_grid(
+        C1=[10,15,20], C2=[0.045,0.055,0.065], C3=[1.2,1.4,1.6],
+        MO=[0.4,0.50369], TOI=[44,46], DowMethod=['Wilke-Chang','Hayduk-Minhass']
+    )
+    Master_ms, Masters = Timeit(
+        lambda: [ccm1.Master(Files, Engine='Vector', **Params) for Params in Grid.to_dict('records')], Repeat=1
+    )
+    Sweep_ms, dfSweep = Timeit(ccm1.Sweep, Files, Grid, Repeat=1)
+    assert np.array_equal(
+        np.concatenate([M.dfOutputs['δ'].to_numpy() for M in Masters]), dfSweep['DELTA'].to_numpy()
+    )
+    ## Sets given with different keys take the Master defaults for their missing parameters :
+    dfMixed = ccm1.Sweep(Files, [{'DI':0.0446}, {'DI':0.05, 'C1':10}])
+    assert np.array_equal(
+        dfMixed['DELTA'].to_numpy(),
+        np.concatenate([
+            ccm1.Master(Files, Engine='Vector', **Params).dfOutputs['δ'].to_numpy()
+            for Params in [{'DI':0.0446}, {'DI':0.05, 'C1':10}]
+        ])
+    )
+    print('L1 x{} parameter sets : Master per set {:.0f} ms | Sweep {:.0f} ms | x{:.1f}'.format(
+        len(Grid), Master_ms, Sweep_ms, Master_ms/Sweep_ms
+    ))
+
+def Bench_L1_Calibrate():
+    '''
+    Recovers known C1, C2 and C3 from the δ(t) they produce, starting from the default constants.
+    '''
+    Known = {'C1':12, 'C2':0.07, 'C3':1.3}
+    Run = ccm1.Master(Files, Engine='Vector', **Known)
+    Measured = pd.Series(Run.Val['DELTA'], index=Run.dfInputs.index)
+    Fit_ms, (Fitted, _) = Timeit(ccm1.Calibrate, Files, Measured, Repeat=1)
+    assert all(np.isclose(Fitted[PARAM], Known[PARAM], rtol=1E-6) for PARAM in Known)
+    print('L1 Calibrate C1/C2/C3 : {} evaluations in {:.0f} ms'.format(Fitted['Evaluations'], Fit_ms))
+
+def Bench_L1_Online(Updates=10000):
+    '''
+    Replay of the bundled dataset through the online mode against the 'Loop' engine, then the
+    cost of a single Update after a long feed.
+    '''
+    pd.testing.assert_frame_equal(ccm1.Replay(Files), ccm1.Master(Files).dfOutputs)
+    Online = ccm1.Master({'tab':Files['tab'], 'wax':Files['wax']}, Engine='Prepare')
+    dfFeed = Long_Inputs(Updates//31+1).iloc[:Updates]
+    Feed = list(zip(dfFeed.index.values, dfFeed['Tw'].values, dfFeed['dw'].values, dfFeed['dT/dr'].values))
+    Start = time.perf_counter()
+    for Sample in Feed:
+        Online.Update(*Sample)
+    print('L1 Online x{} updates : {:.1f} us per update'.format(
+        Updates, (time.perf_counter()-Start)/Updates*1E6
+    ))
+
+def Bench_L1_Segments(Segments=200):
+    '''
+    Pipeline of Segments segments, with Tw, dT/dr and Pio changing along its length : one vector
+    Master per segment, against a single Segments call.
+    '''
+    dfInputs = ccd.Get_File_Inputs(Files['xlsx'], 'xlsx')
+    X = np.linspace(0, 1, Segments)[:,np.newaxis]
+    TW = dfInputs['Tw'].to_numpy()[np.newaxis,:] - 2*X
+    DT_DR = dfInputs['dT/dr'].to_numpy()[np.newaxis,:] * (1-0.3*X)
+    P = np.linspace(3*101325, 101325, Segments)
+
+    def Per_segment():
+        return pd.concat([
+            ccm1.Master(
+                {**Files, 'xlsx':pd.DataFrame({'Tw':TW[i], 'dw':dfInputs['dw'], 'dT/dr':DT_DR[i]})},
+                PIO=P[i], Engine='Vector'
+            ).dfOutputs['δ']
+            for i in range(Segments)
+        ], axis=1)
+
+    Master_ms, dfMaster = Timeit(Per_segment, Repeat=1)
+    Segments_ms, dfDelta = Timeit(
+        ccm1.Segments, {'tab':Files['tab'], 'wax':Files['wax']},
+        dfInputs.index.values, TW, dfInputs['dw'].to_numpy(), DT_DR, P
+    )
+    assert np.array_equal(dfMaster.to_numpy(), dfDelta.to_numpy())
+    print('L1 x{} segments : Master per segment {:.0f} ms | Segments {:.1f} ms | x{:.0f}'.format(
+        Segments, Master_ms, Segments_ms, Master_ms/Segments_ms
+    ))
+
+def Bench_L1_Adaptive(Days=180):
+    '''
+    Days of slowly varying inputs at 10-minute samples : the 'Vector' engine over every sample,
+    against the adaptive integrator with daily outputs, checked against a trapezoidal integral
+    of dδ/dt over every sample.
+    '''
+    Time = np.arange(0, Days*24*60, 10.)
+    TW = 35 + 2*np.sin(Time/(30*24*60))
+    dfLong = pd.DataFrame(
+        {'Tw':TW, 'dw':np.full_like(Time, 43.0), 'dT/dr':np.full_like(Time, 300.0)},
+        index = pd.Index(Time, name='Time')
+    )
+    Vector_ms, Vector = Timeit(lambda: ccm1.Master({**Files, 'xlsx':dfLong}, Engine='Vector'), Repeat=1)
+    Adaptive_ms, (dfAdaptive, Integrator) = Timeit(
+        ccm1.Adaptive, {'tab':Files['tab'], 'wax':Files['wax']}, Time, TW, dfLong['dw'], dfLong['dT/dr'], Time[::144],
+        Repeat=1
+    )
+    ## Rates at every sample, in mm/min, are exact on this grid since the inputs are smooth :
+    Rate = Vector.Val['DDEL_DT'] / 10
+    Last = len(Time[::144])*144 - 143
+    Reference = np.sum((Rate[1:Last]+Rate[:Last-1])/2 * np.diff(Time[:Last]))
+    print('L1 x{} samples : Vector {:.0f} ms | Adaptive {:.0f} ms, {} steps, {} evaluations, error {:.1e} mm (estimate {:.1e} mm)'.format(
+        len(Time), Vector_ms, Adaptive_ms, Integrator['Steps'], Integrator['Evaluations'],
+        abs(dfAdaptive['δ'].iloc[-1]-Reference), Integrator['Error']
+    ))
+
+def Bench_L1_Monte_Carlo(N=10000, Masters=200):
+    '''
+    Monte Carlo of N samples against one vector Master per sample (timed over Masters samples
+    only), in this process and over 4 worker processes.
+    '''
+    Uncertainty = {'MO':0.02, 'TOI':0.5, 'TW':0.3, 'C1':1.5, 'C2':0.005, 'C3':0.1}
+    Batch_ms, (dfBands, dfSamples) = Timeit(ccm1.Monte_Carlo, Files, Uncertainty, N, Repeat=1)
+    Workers_ms, (dfBands_workers, _) = Timeit(
+        lambda: ccm1.Monte_Carlo(Files, Uncertainty, N, Workers=4), Repeat=1
+    )
+    pd.testing.assert_frame_equal(dfBands, dfBands_workers)
+
+    dfInputs = ccd.Get_File_Inputs(Files['xlsx'], 'xlsx')
+    def Per_sample():
+        return [
+            ccm1.Master(
+                {**Files, 'xlsx':dfInputs.assign(Tw=dfInputs['Tw']+Sample['TW'])}, Engine='Vector',
+                **{PARAM : Sample[PARAM] for PARAM in ['C1','C2','C3','MO','TOI']}
+            ).dfOutputs['δ'].iloc[-1]
+            for Sample in dfSamples.iloc[:Masters].to_dict('records')
+        ]
+    Master_ms, Final = Timeit(Per_sample, Repeat=1)
+    assert np.array_equal(Final, dfSamples['DELTA'].iloc[:Masters].to_numpy())
+    print('L1 Monte Carlo x{} samples : Master per sample {:.0f} ms (estimated) | batched {:.0f} ms | x{:.0f} | 4 workers {:.0f} ms'.format(
+        N, Master_ms*N/Masters, Batch_ms, Master_ms*N/Masters/Batch_ms, Workers_ms
+    ))
+
+def Bench_Kernels(N=2000000, Segments=40000):
+    '''
+    CC_Kernels compiled with Numba against their NumPy fallback, for more than 10⁶ evaluations:
+    Interp_Cells and Nusselt at N points, and a Segments run of Segments x 31 time steps (table
+    lookups of every property). Skipped without Numba.
+    '''
+    if cck.numba is None:
+        print('Kernels : Numba is not installed, NumPy fallback only')
+        return
+    Table = ccd.Get_File_Inputs(Files['tab'],'tab')[2]['UOW']
+    Rng = np.random.default_rng(0)
+    PIndex, TIndex = Rng.uniform(0, 49, N), Rng.uniform(0, 49, N)
+    RE, PR, L_DH = Rng.uniform(500, 50000, N), Rng.uniform(1, 50, N), Rng.uniform(10, 200, N)
+
+    dfInputs = ccd.Get_File_Inputs(Files['xlsx'], 'xlsx')
+    X = np.linspace(0, 1, Segments)[:,np.newaxis]
+    Segment_inputs = (
+        {'tab':Files['tab'], 'wax':Files['wax']}, dfInputs.index.values,
+        dfInputs['Tw'].to_numpy()[np.newaxis,:] - 2*X, dfInputs['dw'].to_numpy(),
+        dfInputs['dT/dr'].to_numpy()[np.newaxis,:] * (1-0.3*X), np.linspace(3*101325, 101325, Segments)
+    )
+    Runs = [
+        ('Interp_Cells x{}'.format(N), cck.Interp_Cells, (Table, PIndex, TIndex)),
+        ('Nusselt x{}'.format(N), cck.Nusselt, (RE, PR, L_DH, 2.0, 0.06*RE*0.01)),
+        ('L1 Segments x{}'.format(Segments*len(dfInputs)), ccm1.Segments, Segment_inputs)
+    ]
+    for Name, func, args in Runs:
+        ## First call compiles (or loads the cached kernels), and is left out of the timing :
+        func(*args)
+        Numba_ms, Compiled = Timeit(func, *args, Repeat=3)
+        cck.Use_numba = False
+        NumPy_ms, Fallback = Timeit(func, *args, Repeat=3)
+        cck.Use_numba = True
+        Compiled, Fallback = np.array(Compiled, dtype=np.float64), np.array(Fallback, dtype=np.float64)
+        print('Kernels {} : NumPy {:.0f} ms | Numba {:.0f} ms | x{:.1f} | max relative difference {:.1e}'.format(
+            Name, NumPy_ms, Numba_ms, NumPy_ms/Numba_ms, np.nanmax(np.abs(Compiled - Fallback)/np.abs(Fallback))
+        ))
+
+def Bench_Coupled():
+    '''
+    Coupled runs of 27 C1, C2 and C3 cases : one Master per case, against all cases solved together.
+    '''
+    Coupled_files = {
+        'tab':Files['tab'], 'wax':Files['wax'],
+        'Inputs.xlsx':'./Files/Dataset Level 2 Inputs.xlsx',
+        'Coolant.xlsx':'./Files/Dataset Level 2 Coolant.xlsx'
+    }
+    Cases = ccm1.Sweep_grid(C1=[10,15,20], C2=[0.045,0.055,0.065], C3=[1.2,1.4,1.6])
+    Master_ms, Masters = Timeit(
+        lambda: [ccmc.Master(Coupled_files, **Params) for Params in Cases.to_dict('records')], Repeat=1
+    )
+    Cases_ms, Coupled = Timeit(ccmc.Master, Coupled_files, Cases, Repeat=1)
+    assert np.array_equal(
+        np.concatenate([M.dfOutputs['δ'].to_numpy() for M in Masters]), Coupled.dfOutputs['δ'].to_numpy()
+    )
+    print('Coupled x{} cases : Master per case {:.0f} ms | all cases {:.0f} ms | x{:.1f} | {} iterations'.format(
+        len(Cases), Master_ms, Cases_ms, Master_ms/Cases_ms, Coupled.Iterations.sum()
+    ))
+
+
+if __name__ == '__main__':
+    Bench_TAB_Parser()
+    Bench_WAX_Parser()
+    Bench_Cache()
+    Bench_Interp_Cell()
+    Bench_Get_Properties()
+    Bench_Find_DC_DT()
+    Bench_L1_Engine()
+    Bench_L1_Sweep()
+    Bench_L1_Calibrate()
+    Bench_L1_Online()
+    Bench_L1_Segments()
+    Bench_L1_Adaptive()
+    Bench_L1_Monte_Carlo()
+    Bench_Kernels()
+    Bench_Coupled()
@@ -1,7 +1,12 @@
+import io
+import os
 import math
+import struct
+import hashlib
+import zipfile
 import numpy as np
 import pandas as pd
-from scipy.interpolate import griddata
+import CC_Kernels as cck
 
 def Abbreviations(handle):
     Abbrev = {
@@ -167,20 +172,189 @@ def Abbreviations(handle):
 
     return Abbrev.get(handle, '-')
 
-def Get_File_Inputs(filepath, filetype):
+## Parsed TAB and WAX tables are cached in Cache_folder as .npz files, keyed by the SHA-256 of
+## the source file and Parser_version. Bump Parser_version whenever the parsed layout changes.
+## With Mmap_mode, cached tables are opened as read-only np.memmap instead of being read in.
+Parser_version = 6
+Cache_folder = './cache'
+Cache_size = 200E6
+Mmap_mode = False
+
+## The cache is only an optimisation: on any of these errors (cache folder that cannot be written,
+## corrupt or truncated cache file), the file is parsed as if there was no cache :
+Cache_errors = (OSError, ValueError, KeyError, EOFError, struct.error, zipfile.BadZipFile)
+
+def Get_File_Inputs(filepath, filetype, Cache=True, Mmap=None):
     if filetype=='xlsx':
+        ## Dataframe already loaded in memory is used as it is :
+        if isinstance(filepath, pd.DataFrame):
+            return filepath
         ## We use pandas read_excel straight forward for excel input file :
         dfIO = pd.read_excel(filepath, index_col=0)
         return dfIO
     else:
+        Mmap = Mmap_mode if Mmap is None else Mmap
+        ## Return the previously parsed tables of the exact same file content, if any :
+        if Cache:
+            CachePath = Cache_Path(filepath, filetype)
+            if os.path.isfile(CachePath):
+                try:
+                    return Load_Cache(CachePath, Mmap)
+                except Cache_errors:
+                    Remove_Cache(CachePath)
         ## For TAB and WAX files, LoadTextFiles function to convert textfile lines into list :
         TextLines = LoadTextFiles(filepath)
         ## LookFor_P_TEMP function to obtain Pressure and Temperature tables :
         P, TEMP = LookFor_P_TEMP(TextLines, filetype)
         ## LookFor_Properties function to obtain corresponding TAB or WAX properties :
         PropertiesTable = LookFor_Properties(TextLines, filetype)
+        if Cache:
+            try:
+                Save_Cache(CachePath, P, TEMP, PropertiesTable)
+                ## Reopen the converted binary form, so every run maps the same physical copy :
+                if Mmap:
+                    return Load_Cache(CachePath, Mmap)
+            except Cache_errors:
+                pass
         return P, TEMP, PropertiesTable
 
+def Get_Upload_Inputs(Data, filetype):
+    '''
+    Same as Get_File_Inputs (without cache), for the raw bytes of an uploaded file kept in memory.
+    '''
+    if filetype=='xlsx':
+        return pd.read_excel(io.BytesIO(Data), index_col=0)
+    ## Universal newlines, as when LoadTextFiles reads the file from disk :
+    TextLines = list(io.StringIO(Data.decode('utf-8'), newline=None))
+    P, TEMP = LookFor_P_TEMP(TextLines, filetype)
+    PropertiesTable = LookFor_Properties(TextLines, filetype)
+    return P, TEMP, PropertiesTable
+
+def File_Hash(filepath):
+    Hash = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for Chunk in iter(lambda: f.read(1<<20), b''):
+            Hash.update(Chunk)
+    return Hash.hexdigest()
+
+def Cache_Path(filepath, filetype):
+    return os.path.join(
+        Cache_folder, '{}-{}-v{}.npz'.format(filetype, File_Hash(filepath), Parser_version)
+    )
+
+def Save_Cache(CachePath, P, TEMP, PropertiesTable):
+    '''
+    Pressure and Temperature arrays are stored as they are, and every property array under
+    its abbreviation prefixed by 'PROP_'.
+    The file is written under a temporary name first, so that a concurrent run never loads
+    a half written cache.
+    '''
+    os.makedirs(Cache_folder, exist_ok=True)
+    Arrays = {
+        'P' : P,
+        'TEMP' : TEMP,
+        **{'PROP_'+PROP : PropertiesTable[PROP] for PROP in PropertiesTable}
+    }
+    TempPath = CachePath+'.{}.tmp'.format(os.getpid())
+    try:
+        with open(TempPath, 'wb') as f:
+            np.savez(f, **Arrays)
+        os.replace(TempPath, CachePath)
+    except OSError:
+        Remove_Cache(TempPath)
+        raise
+    Evict_Cache()
+
+def Load_Cache(CachePath, Mmap=False):
+    if Mmap:
+        Arrays = Open_Memmap(CachePath)
+        P, TEMP, PropertiesTable = Unpack_Cache(Arrays, list(Arrays))
+    else:
+        with np.load(CachePath) as Arrays:
+            P, TEMP, PropertiesTable = Unpack_Cache(Arrays, Arrays.files)
+    ## Updating modified time, so that eviction removes the least recently used files first
+    ## (not possible in a read-only cache folder, which is still used as it is) :
+    try:
+        os.utime(CachePath)
+    except OSError:
+        pass
+    return P, TEMP, PropertiesTable
+
+def Unpack_Cache(Arrays, Names):
+    P, TEMP = Arrays['P'], Arrays['TEMP']
+    PropertiesTable = {
+        Name[len('PROP_'):] : Arrays[Name]
+        for Name in Names
+        if Name.startswith('PROP_')
+    }
+    return P, TEMP, PropertiesTable
+
+def Open_Memmap(CachePath):
+    '''
+    np.savez writes every array as an uncompressed .npy member of a zip file, so each member
+    is a contiguous block of the cache file. We locate the data of every member (past its
+    zip local header and .npy header) and open it as a read-only np.memmap of that block.
+
+    Nothing is read at this point: the OS pages in only the property blocks that are indexed
+    later on, and all processes mapping the same cache file share one physical copy.
+
+    Output: Dictionary that maps array names to their np.memmap.
+    '''
+    Read_header = {
+        (1,0) : np.lib.format.read_array_header_1_0,
+        (2,0) : np.lib.format.read_array_header_2_0
+    }
+    Arrays = {}
+    with zipfile.ZipFile(CachePath) as z, open(CachePath, 'rb') as f:
+        for Info in z.infolist():
+            if Info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError('Cannot memory-map compressed member {}'.format(Info.filename))
+            ## Zip local file header is 30 bytes, followed by the file name and extra field :
+            f.seek(Info.header_offset)
+            NameLen, ExtraLen = struct.unpack('<HH', f.read(30)[26:30])
+            f.seek(Info.header_offset+30+NameLen+ExtraLen)
+            Shape, Fortran, Dtype = Read_header[np.lib.format.read_magic(f)](f)
+            Arrays[Info.filename[:-len('.npy')]] = np.memmap(
+                CachePath, dtype=Dtype, mode='r', offset=f.tell(),
+                shape=Shape, order='F' if Fortran else 'C'
+            )
+    return Arrays
+
+def Evict_Cache(MaxSize=None):
+    '''
+    Removes the least recently used cache files until the cache folder fits in MaxSize bytes
+    (Cache_size by default). Cache files of older Parser_version are always removed.
+    '''
+    MaxSize = Cache_size if MaxSize is None else MaxSize
+    if not os.path.isdir(Cache_folder):
+        return
+    CacheFiles = [
+        os.path.join(Cache_folder, f)
+        for f in os.listdir(Cache_folder)
+        if f.endswith('.npz')
+    ]
+    for f in CacheFiles:
+        if not f.endswith('-v{}.npz'.format(Parser_version)):
+            Remove_Cache(f)
+    CacheFiles = sorted(
+        [f for f in CacheFiles if os.path.isfile(f)], key=os.path.getmtime, reverse=True
+    )
+    Total = 0
+    for f in CacheFiles:
+        Total += os.path.getsize(f)
+        if Total > MaxSize:
+            Remove_Cache(f)
+
+def Remove_Cache(CacheFile):
+    ## Another run may have evicted the same file already, or still has it memory-mapped :
+    try:
+        os.remove(CacheFile)
+    except OSError:
+        pass
+
+def Clear_Cache():
+    Evict_Cache(MaxSize=0)
+
 def LoadTextFiles(filepath):
     f = open(filepath, 'r')
     TextLines = []
@@ -193,53 +367,65 @@ def SplitTextLine(TextLine):
     Arr = [float(A) for A in TextLine.split()]
     return Arr
 
+def Check_axis(Axis, Name, File):
+    ## P_TEMP_Index and P_TEMP_Indices bracket values by binary search, on strictly increasing axes only :
+    if not np.all(np.diff(Axis)>0):
+        raise ValueError('{} points of the {} file are not in strictly increasing order'.format(Name, File.upper()))
+    return Axis
+
+def WAX_Dimensions(TextLines):
+    ## Number of pressure and temperature points, from the line after '!Number of P Points' :
+    Dimension_pointer = [
+        i
+        for i, Line in enumerate(TextLines)
+        if '!Number of P Points' in Line
+    ]
+    if not Dimension_pointer:
+        raise ValueError("WAX file has no '!Number of P Points, Number of T Points' line")
+    NP, NT = [int(n) for n in TextLines[Dimension_pointer[0]+1].split()[:2]]
+    return NP, NT
+
 def LookFor_P_TEMP(TextLines, File):
     if File == 'tab':
         '''
-        In TAB file, Pressure points located from Line 3 to 11, 
-        while Temperature points located from Line 12 to 22.
-        Each line contains 5 points separated by \t. 
-        We use SplitTextLine to split line into list array of 5.
+        In TAB file, the number of Pressure and Temperature points is given in Line 2.
+        Pressure points located from Line 3 onwards (Line 3 to 12 for 50 points),
+        immediately followed by Temperature points (Line 13 to 22 for 50 points).
+        Each line contains 5 points separated by \t.
 
-        Output: Two (2) sets of Dictionaries that maps pressure and
-                temperature points from 1 to 50.
+        Output: Two (2) sorted arrays of pressure and temperature points,
+                numbered from 0 to 49. ValueError if either is not strictly increasing.
         '''
         ## Note that python numbering starts at 0
-        Pointer = {
-            'P': np.arange(2,12),
-            'TEMP': np.arange(12,22),
-        }
-        PT = {}
-        for Property in Pointer.keys():
-            PropertyPoints, Count = {}, 1
-            for n in Pointer[Property]:
-                for Point in SplitTextLine(TextLines[n]):
-                    PropertyPoints[Count] = Point
-                    Count += 1
-            PT[Property] = PropertyPoints
-        return PT['P'], PT['TEMP']
+        NP, NT = [int(n) for n in TextLines[1].split()[:2]]
+        Lines_P, Lines_T = int(np.ceil(NP/5)), int(np.ceil(NT/5))
+        P = np.fromstring(''.join(TextLines[2:2+Lines_P]), dtype=np.float64, sep=' ')
+        TEMP = np.fromstring(
+            ''.join(TextLines[2+Lines_P:2+Lines_P+Lines_T]), dtype=np.float64, sep=' '
+        )
+        return Check_axis(P, 'Pressure', File), Check_axis(TEMP, 'Temperature', File)
 
     elif File == 'wax':
         '''
-        In WAX file, 
+        In WAX file, the number of Pressure and Temperature points is given in the line after
+        '!Number of P Points, Number of T Points' (see WAX_Dimensions).
         Pressure points located at every 1 line after '!Pressure Point No.'
         Followed by 30 temperature points (j) located at [3+(9*j)].
 
-        Output: Two (2) sets of Dictionaries that maps pressure and
-                temperature points from 1 to 30.
+        Output: Two (2) sorted arrays of pressure and temperature points,
+                numbered from 0 to 29. ValueError if either is not strictly increasing.
         '''
         Pointer = [
             i
             for i, Line in enumerate(TextLines)
             if '!Pressure Point No.' in Line
         ]
-        P, TEMP = {}, {}
-        for i, point in enumerate(Pointer):
-            P[i+1] = float(TextLines[point+1])
-            if i==0:
-                for j in range(30):
-                    TEMP[j+1] = float(TextLines[point+3+(9*j)])
-        return P, TEMP
+        NP, NT = WAX_Dimensions(TextLines)
+        if len(Pointer)<NP:
+            raise ValueError('WAX file has {} pressure points, {} expected'.format(len(Pointer), NP))
+        P = np.array([float(TextLines[point+1]) for point in Pointer[:NP]])
+        TEMP = np.array([float(TextLines[Pointer[0]+3+(9*j)]) for j in range(NT)])
+        return Check_axis(P, 'Pressure', File), Check_axis(TEMP, 'Temperature', File)
 
 def LookFor_Properties(TextLines, File):
     if File == 'tab':
@@ -251,8 +437,9 @@ def LookFor_Properties(TextLines, File):
         contains the corresponding property values at 50 different temperature points.
         '''
         Property_pointer = {
-            PROP : i+1 
-            for i, Line in enumerate(TextLines) 
+            PROP : i+1
+            for i, Line in enumerate(TextLines)
+            if 'LIQUID ' in Line
             for PROP in [
                 'DENSITY','VISCOSITY',
                 'HEAT CAPACITY','THERMAL CONDUCTIVITY'
@@ -266,24 +453,20 @@ def LookFor_Properties(TextLines, File):
             'THERMAL CONDUCTIVITY' : 'KOW'
         }
         '''
-        We then create 3 tiers of nested dictionaries:
-        T1 (Tier 1) : Dictionary of all TAB properties.
-        T2 (Tier 2) : Dictionary of single TAB property of all 50 pressure points.
-        T3 (Tier 3) : Dictionary of single TAB property of all 50 temperature points 
-                    in a single pressure point.
+        We then load each property block with a single bulk np.fromstring call into a dense
+        float64 array, with pressure points as rows and temperature points as columns.
+        The number of pressure and temperature points is read from the 2nd line of the file,
+        and each pressure point spans ceil(NT/5) text lines of 5 values.
+
+        Output: Dictionary that maps each TAB property to its (NP x NT) array.
         '''
+        NP, NT = [int(n) for n in TextLines[1].split()[:2]]
+        Lines_per_P = int(np.ceil(NT/5))
         T1 = {}
         for PROP in Property_pointer:
-            Line_init, T2 = Property_pointer[PROP], {}
-            for i in range(50):
-                T3, Count = {}, 1
-                for n in np.arange(Line_init, Line_init+10):
-                    for value in SplitTextLine(TextLines[n]):
-                        T3[Count] = value
-                        Count += 1
-                T2[i+1] = T3
-                Line_init += 10
-            T1[Abbrev[PROP]] = T2
+            Line_init = Property_pointer[PROP]
+            Block = ''.join(TextLines[Line_init:Line_init+(NP*Lines_per_P)])
+            T1[Abbrev[PROP]] = np.fromstring(Block, dtype=np.float64, sep=' ').reshape(NP, NT)
         return T1
 
     elif File == 'wax':
@@ -311,66 +494,48 @@ def LookFor_Properties(TextLines, File):
             'Dens' : 47, 
             # 'Gas MW' : 48,
             'Liq MW' : 49, 
-            'Wax MW' : 50 #,
+            'Wax MW' : 50,
             # 'Hwax' : 51,
             # 'Cpwax' : 52,
-            # 'Therm Cond' : 53
+            'Therm Cond' : 53
         }
         Abbrev = {
             'Wax Concs' : 'CWAX', 
             'Dens' : 'RHOWW', 
             # 'Gas MW' : '',
             'Liq MW' : 'MWOW', 
-            'Wax MW' : 'MWWW' #,
+            'Wax MW' : 'MWWW',
             # 'Hwax' : '',
             # 'Cpwax' : '',
-            # 'Therm Cond' : ''
+            'Therm Cond' : 'KWAX'
         }
 
         '''
-        We then create 3 tiers of nested dictionaries:
-        T1 (Tier 1) : Dictionary of all WAX properties for all 50 pressure points.
-        T2 (Tier 2) : Dictionary of all WAX properties for all 50 temperature points 
-                    in a single pressure point.
-        T3 (Tier 3) : Dictionary of single WAX property value at given pressure and
-                    temperature point.
+        Each temperature point spans 9 text lines: the temperature itself followed by 8 lines
+        of 54 WAX property values. We load all temperature points of a single pressure point
+        with one bulk np.fromstring call into a (NT x 55) array, keep the temperature column aside,
+        and copy the required properties straight into two preallocated compact arrays :
+            Props   (NP x NT x 4)   Dens, Liq MW, Wax MW and Therm Cond.
+            Concs   (NP x NT x 47)  Wax Concs.
+        N1 (New Tier 1) : Dictionary of all WAX properties. Single properties are (NP x NT)
+                        views of Props, so the values are not copied a second time.
         '''
-        T1 = {}
-        for i in range(30):
-            T2 = {}
-            Line_init = Segment_pointer[i]
-            for j in range(30):
-                Linenum = Line_init+4+(9*j)
-                Values_ij, T3 = [], {}
-                for n in np.arange(Linenum, Linenum+8):
-                    for value in SplitTextLine(TextLines[n]):
-                        Values_ij.append(value)
-                for PROP in Property_pointer:
-                    Value_index = Property_pointer[PROP]
-                    if isinstance(Value_index,int):
-                        T3[PROP] = Values_ij[Value_index]
-                    else:
-                    # 'Wax Concs' stored as list of 47 values. Others are integer.
-                        T3[PROP] = [Values_ij[v] for v in Value_index]
-                T2[j+1] = T3
-            T1[i+1] = T2
-
-        '''
-        Rearranging the nested dictionaries, to follow previous (TAB) format.
-        N1 (New Tier 1) : Dictionary of all WAX properties.
-        N2 (New Tier 2) : Dictionary of single WAX property of all 50 pressure points.
-        N3 (New Tier 3) : Dictionary of single WAX property of all 50 temperature points 
-                        in a single pressure point.
-        '''
-        N1 = {}
-        for PROP in Property_pointer:
-            N2 = {}
-            for i in range(30):
-                N3 = {}
-                for j in range(30):
-                    N3[j+1] = T1[i+1][j+1][PROP]
-                N2[i+1] = N3
-            N1[Abbrev[PROP]] = N2
+        NP, NT = WAX_Dimensions(TextLines)
+        Props_list = [PROP for PROP in Property_pointer if PROP!='Wax Concs']
+        Props_index = [Property_pointer[PROP] for PROP in Props_list]
+        Props = np.empty((NP, NT, len(Props_list)), dtype=np.float64)
+        Concs = np.empty((NP, NT, len(Property_pointer['Wax Concs'])), dtype=np.float64)
+        for i, Line_init in enumerate(Segment_pointer[:NP]):
+            Block = ''.join(TextLines[Line_init+3:Line_init+3+(9*NT)])
+            Values = np.fromstring(Block, dtype=np.float64, sep=' ').reshape(NT, -1)
+            TEMP = Values[:,0]
+            Props[i] = Values[:,1:][:,Props_index]
+            Concs[i] = Values[:,1:][:,Property_pointer['Wax Concs']]
+        N1 = {Abbrev[PROP] : Props[:,:,i] for i, PROP in enumerate(Props_list)}
+        N1[Abbrev['Wax Concs']] = Concs
+
+        ## Total dissolved wax and its dC/dT slopes over the whole (P x TEMP) grid, for Find_DC_DT :
+        N1['CWAXTOTAL'], N1['DC_DT_POINT'], N1['DC_DT_CELL'] = DC_DT_Tables(Concs, TEMP)
 
         '''
         In the same WAX file, we can find several WAX properties related to wax components,
@@ -393,41 +558,54 @@ def LookFor_Properties(TextLines, File):
             'Concentration of wax components in feed' : 'CWAXFEED'       
         }
         '''
-        Addition to previous N1, we created 2nd tier of dictionary :
-        A2 (Addition Tier 2) : Dictionary of a single WAX components property.
+        Addition to previous N1, a single WAX components property is stored as 1D array.
         '''
         for PROP in Property_pointer:
-            A2 = {}
-            Count = 1
-            for Line in Property_pointer[PROP]:
-                for Point in SplitTextLine(TextLines[Line]):
-                    A2[Count] = Point
-                    Count += 1
-            N1[Abbrev[PROP]] = A2
+            Block = ''.join([TextLines[Line] for Line in Property_pointer[PROP]])
+            N1[Abbrev[PROP]] = np.fromstring(Block, dtype=np.float64, sep=' ')
         return N1
 
 def P_TEMP_Index(Table, Value):
     '''
     This function converts Pressure or Temperature value into index number of the reference table.
-    Function will return the exact index and True if the value provided equals to any one of 
+    Table is the sorted array of pressure/temperature points, so the bounding points are found by
+    binary search (np.searchsorted) in O(log n).
+    Function will return the exact index and True if the value provided equals to any one of
     pressure/temperature points.
-    Else, interpolated 'index' will be calculated using linear interpolation, and marked as False. 
+    Else, interpolated 'index' will be calculated using linear interpolation, and marked as False.
     The boolean (True/False) output will be used later when getting corresponding properties.
     '''
-    Index_exact = [i for i in Table if Table[i]==Value]
-    if Index_exact:
-        return [Index_exact[0], True]
-    else:
-        Upperbound = np.argsort([Table[i]-Value if Table[i]-Value>0 else 1E8 for i in Table])[0]
-        Lowerbound = np.argsort([Value-Table[i] if Value-Table[i]>0 else 1E8 for i in Table])[0]
-        Nearest = [
-            index 
-            for j in [Lowerbound, Upperbound] 
-            for i, index in enumerate(Table) 
-            if j==i
-        ]
-        Index_interp = ((Value - Table[Nearest[0]])/(Table[Nearest[1]]-Table[Nearest[0]])) + Nearest[0]
-        return [Index_interp, False]
+    Upperbound = int(np.searchsorted(Table, Value))
+    if Upperbound<len(Table) and Table[Upperbound]==Value:
+        return [Upperbound, True]
+    if Upperbound==0 or Upperbound==len(Table):
+        raise ValueError('{} is outside the table range {} to {}'.format(Value, Table[0], Table[-1]))
+    Lowerbound = Upperbound-1
+    Index_interp = ((Value - Table[Lowerbound])/(Table[Upperbound]-Table[Lowerbound])) + Lowerbound
+    return [Index_interp, False]
+
+def P_TEMP_Indices(Table, Values):
+    '''
+    Vectorized P_TEMP_Index for an array of pressure or temperature values in one call.
+
+    Output: Two (2) arrays with the shape of Values:
+            [1] Fractional 'index' (whole number where the value is exactly on a table point).
+            [2] Exact flag (True = exact, False = interpolated).
+    '''
+    Values = np.asarray(Values, dtype=np.float64)
+    ## Written so that NaN is outside the table range too :
+    Outside = ~((Values>=Table[0]) & (Values<=Table[-1]))
+    if np.any(Outside):
+        raise ValueError('{} is outside the table range {} to {}'.format(Values[Outside].flat[0], Table[0], Table[-1]))
+    Position = np.searchsorted(Table, Values)
+    Exact = Table[np.minimum(Position, len(Table)-1)]==Values
+    Upperbound = np.clip(Position, 1, len(Table)-1)
+    Lowerbound = Upperbound-1
+    Index = np.where(
+        Exact, Position,
+        ((Values - Table[Lowerbound])/(Table[Upperbound]-Table[Lowerbound])) + Lowerbound
+    )
+    return Index, Exact
 
 def Get_Property(P_Index, TEMP_Index, PropertyTable):
     '''
@@ -435,30 +613,46 @@ def Get_Property(P_Index, TEMP_Index, PropertyTable):
     [1] PIndex or TIndex : The exact or interpolated 'index'
     [2] PExact or TExact : True = exact, False = interpolated
     If both P and TEMP are True, then we can directly use them to obtain corresponding property
-    value from the nested dictionaries. However if any one is False, then we need to interpolate.
+    value from the (P x TEMP) property array. However if any one is False, then we need to
+    interpolate.
     '''
     [PIndex, PExact] = P_Index
     [TIndex, TExact] = TEMP_Index
 
     if PExact:
         if TExact:
-            Value = PropertyTable[PIndex][TIndex]
+            Value = PropertyTable[PIndex, TIndex]
         else:
             Value = Interp_Property(PropertyTable[PIndex], TIndex)
     else:
         if TExact:
-            ## Reformulate: a dictionary of single property for all pressure points in a single pressure point :
-            PropertyTable_TIndex = {P:PropertyTable[P][TIndex] for P in PropertyTable}
-            Value = Interp_Property(PropertyTable_TIndex, PIndex)
+            ## Reformulate: single property for all pressure points at a single temperature point :
+            Value = Interp_Property(PropertyTable[:,TIndex], PIndex)
         else:
             Value = Interp_Property(PropertyTable, [PIndex, TIndex], Both=True)
     return Value
 
+def Get_Properties(P, TEMP, P_Table, TEMP_Table, PropertiesTable, Names):
+    '''
+    Batch form of P_TEMP_Index and Get_Property: arrays (or scalars) of pressures and
+    temperatures are converted into 'index' once, and every property in Names is then
+    interpolated for all (P, TEMP) pairs in one vectorized pass with Interp_Cells.
+
+    Output: Array of shape (n, len(Names)) for n (P, TEMP) pairs, i.e. one column per
+            property in the order of Names. P and TEMP broadcast against each other, so
+            a single pressure can be used with a whole temperature series.
+    '''
+    PIndex, _ = P_TEMP_Indices(P_Table, P)
+    TIndex, _ = P_TEMP_Indices(TEMP_Table, TEMP)
+    return np.stack(
+        [Interp_Cells(PropertiesTable[Name], PIndex, TIndex) for Name in Names], axis=-1
+    )
+
 def Interp_Property(PropertyTable, Index, Both=False):
     '''
     If only one of P or TEMP is interpolated index, then we interpolate by simply using
     linear interpolation.
-    If both of them are interpolated index, we use griddata to interpolate.
+    If both of them are interpolated index, we use Interp_Cell to interpolate.
     '''
     if not Both:
         Lower_bound = PropertyTable[int(np.floor(Index))]
@@ -467,49 +661,111 @@ def Interp_Property(PropertyTable, Index, Both=False):
         Property = (Ratio * (Upper_bound - Lower_bound)) + Lower_bound
     else:
         [PIndex, TIndex] = Index
-        Points = [
-            [P,T] 
-            for P in [np.floor(PIndex), np.ceil(PIndex)] 
-            for T in [np.floor(TIndex), np.ceil(TIndex)]
-        ]
-        Values = [
-            PropertyTable[P][T] 
-            for P in [np.floor(PIndex), np.ceil(PIndex)] 
-            for T in [np.floor(TIndex), np.ceil(TIndex)]
-        ]
-        Xi = ([PIndex, TIndex])
-        Property = griddata(Points, Values, Xi, method='linear')
+        Property = Interp_Cell(PropertyTable, PIndex, TIndex)
     return Property
 
-def Find_DC_DT(P_Index, TEMP_Index, TEMP_Table, CWAX_Table, CWAX_Feed):
-    
+def Interp_Cell(PropertyTable, PIndex, TIndex):
+    '''
+    Closed-form interpolation within the grid cell bounding (PIndex, TIndex), for a scalar.
+
+    The cell is split into two triangles along its diagonal from (floor P, floor T) to
+    (ceil P, ceil T), and the property is interpolated linearly within the triangle that
+    contains the point. This is exactly the triangulation griddata(method='linear') used on
+    the four cell corners, without building a Qhull triangulation on every call.
+    '''
+    P0, T0 = int(np.floor(PIndex)), int(np.floor(TIndex))
+    P1, T1 = min(P0+1, PropertyTable.shape[0]-1), min(T0+1, PropertyTable.shape[1]-1)
+    X, Y = PIndex-P0, TIndex-T0
+    V00, V11 = float(PropertyTable[P0, T0]), float(PropertyTable[P1, T1])
+    if X>=Y:
+        V10 = float(PropertyTable[P1, T0])
+        return V00 + ((V10 - V00)*X) + ((V11 - V10)*Y)
+    else:
+        V01 = float(PropertyTable[P0, T1])
+        return V00 + ((V01 - V00)*Y) + ((V11 - V01)*X)
+
+def Interp_Cells(PropertyTable, PIndex, TIndex):
+    '''
+    Batched Interp_Cell for arrays of fractional (PIndex, TIndex) pairs, e.g. from P_TEMP_Indices.
+    Exact indices fall on a cell edge or corner, so all four cases of Get_Property are covered
+    by the same expression.
+    The lookup itself is the compiled kernel of CC_Kernels when Numba is available.
+    '''
+    return cck.Interp_Cells(
+        PropertyTable, np.asarray(PIndex, dtype=np.float64), np.asarray(TIndex, dtype=np.float64)
+    )
+
+def Interp_Line(PropertyTable, Index):
+    '''
+    Batched form of Interp_Property (single interpolated index) for an array of fractional
+    'index' over a 1D property table, e.g. coolant properties at an array of temperatures.
+    '''
+    Lower = np.floor(Index).astype(int)
+    Upper = np.minimum(Lower+1, len(PropertyTable)-1)
+    Ratio = Index - Lower
+    return (Ratio * (PropertyTable[Upper] - PropertyTable[Lower])) + PropertyTable[Lower]
+
+def DC_DT_Tables(CWAX_Table, TEMP_Table):
+    '''
+    Precomputes everything Find_DC_DT needs once, when the WAX file is loaded.
+    CWAX_Table is the (NP x NT x 47) array of wax component concentrations.
+
+    Output: Three (3) arrays:
+            [1] CWAXTOTAL   (NP x NT)     Total dissolved wax at every grid point.
+            [2] DC_DT_POINT (NP x NT)     Signed slope around an exact temperature point, over its
+                                          two neighbours (clamped to the first/last point).
+            [3] DC_DT_CELL  (NP x NT-1)   Signed slope across each temperature cell, for an
+                                          interpolated temperature.
+    The wax feed concentration cancels out of the precipitated wax difference, so the slopes
+    only depend on the dissolved wax. Absolute value is taken after the pressure blend.
+    '''
+    CWAX_Total = CWAX_Table.sum(axis=2)
+    Points = np.arange(len(TEMP_Table))
+    LowerT = np.maximum(Points-1, 0)
+    UpperT = np.minimum(Points+1, len(TEMP_Table)-1)
+    DC_DT_Point = (
+        (CWAX_Total[:, LowerT] - CWAX_Total[:, UpperT]) / (TEMP_Table[LowerT] - TEMP_Table[UpperT])
+    )
+    DC_DT_Cell = (
+        (CWAX_Total[:, :-1] - CWAX_Total[:, 1:]) / (TEMP_Table[:-1] - TEMP_Table[1:])
+    )
+    return CWAX_Total, DC_DT_Point, DC_DT_Cell
+
+def Find_DC_DT(P_Index, TEMP_Index, WAX_Properties):
+    '''
+    Wax solubility slope dC/dT from the tables precomputed by DC_DT_Tables: an exact
+    temperature point reads DC_DT_POINT, an interpolated one reads the DC_DT_CELL of its
+    temperature cell. Only the pressure is blended linearly when it is off-grid.
+    '''
     [PIndex, PExact] = P_Index
     [TIndex, TExact] = TEMP_Index
 
     if TExact:
-        LowerT = TIndex-1 if TIndex-1>0 else 0
-        UpperT = TIndex+1 if TIndex+1<30 else 30
+        Slopes = WAX_Properties['DC_DT_POINT'][:, TIndex]
     else:
-        LowerT = int(np.floor(TIndex))
-        UpperT = int(np.ceil(TIndex))
+        Slopes = WAX_Properties['DC_DT_CELL'][:, int(np.floor(TIndex))]
 
     if PExact:
-        CWAX_LowerT = sum(CWAX_Table[PIndex][LowerT])
-        CWAX_UpperT = sum(CWAX_Table[PIndex][UpperT])
+        DC_DT = Slopes[PIndex]
     else:
-        CWAXTable_LowerT = {P:sum(CWAX_Table[P][LowerT]) for P in CWAX_Table}
-        CWAXTable_UpperT = {P:sum(CWAX_Table[P][UpperT]) for P in CWAX_Table}
-        CWAX_LowerT = Interp_Property(CWAXTable_LowerT, PIndex)
-        CWAX_UpperT = Interp_Property(CWAXTable_UpperT, PIndex)
-
-    CWaxPercipitate_Lower = CWAX_Feed - CWAX_LowerT
-    CWaxPercipitate_Upper = CWAX_Feed - CWAX_UpperT
-
-    TEMP_Lower = TEMP_Table[LowerT]
-    TEMP_Upper = TEMP_Table[UpperT]
-    DC_DT = abs((CWaxPercipitate_Upper - CWaxPercipitate_Lower) / (TEMP_Lower - TEMP_Upper))
+        DC_DT = Interp_Property(Slopes, PIndex)
+    return abs(float(DC_DT))
 
-    return DC_DT
+def Find_DC_DTs(P, TEMP, P_Table, TEMP_Table, WAX_Properties):
+    '''
+    Batched Find_DC_DT for arrays (or scalars) of pressures and wall temperatures, which
+    broadcast against each other like in Get_Properties.
+    '''
+    PIndex, _ = P_TEMP_Indices(P_Table, P)
+    TIndex, TExact = P_TEMP_Indices(TEMP_Table, TEMP)
+    Point = WAX_Properties['DC_DT_POINT']
+    Cell = WAX_Properties['DC_DT_CELL']
+    ## Integer temperature 'index' keeps Interp_Cells on a single column, i.e. a pressure blend :
+    TPoint = np.floor(TIndex)
+    TCell = np.minimum(TPoint, Cell.shape[1]-1)
+    return np.abs(np.where(
+        TExact, Interp_Cells(Point, PIndex, TPoint), Interp_Cells(Cell, PIndex, TCell)
+    ))
 
 def round_sig(x, sig=3):
     if isinstance(x,np.ndarray):
@@ -519,6 +775,96 @@ def round_sig(x, sig=3):
     except:
         return np.round(x, sig)
 
+def round_sig_array(x, sig=3):
+    '''
+    Vectorized round_sig, rounding every element to its own number of decimals in the same way
+    np.round does (scale by 10^decimals, round half to even, scale back). Zero, inf and NaN
+    are rounded to sig decimals, as in round_sig.
+    '''
+    x = np.asarray(x, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        Magnitude = np.floor(np.log10(np.abs(x)))
+    Decimals = np.where(np.isfinite(Magnitude), sig-Magnitude-1, sig)
+    Scale = np.power(10.0, np.abs(Decimals))
+    with np.errstate(invalid='ignore', over='ignore'):
+        return np.where(Decimals>=0, np.rint(x*Scale)/Scale, np.rint(x/Scale)*Scale)
+
+def LTTB_Index(x, y, Threshold):
+    '''
+    Largest-Triangle-Three-Buckets downsampling of the (x, y) series to Threshold points.
+    First and last points are kept, and the points in between are split into Threshold-2 buckets.
+    From each bucket we keep the point forming the largest triangle with the point kept from the
+    previous bucket and the average point of the next bucket.
+
+    Output: Sorted array of the kept indices (all indices if the series is not longer than Threshold).
+    '''
+    n = len(x)
+    if Threshold>=n or Threshold<3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    ## NaN values (e.g. laminar steps) are not drawn, so they are only neutral for the selection :
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+    Edges = np.floor(np.linspace(1, n-1, Threshold-1)).astype(int)
+    Edges = np.append(Edges, n)
+    Index = np.empty(Threshold, dtype=int)
+    Index[0], Index[-1] = 0, n-1
+    a = 0
+    for i in range(Threshold-2):
+        Start, End, Next = Edges[i], Edges[i+1], Edges[i+2]
+        AvgX, AvgY = x[End:Next].mean(), y[End:Next].mean()
+        Area = np.abs((x[a]-AvgX)*(y[Start:End]-y[a]) - (x[a]-x[Start:End])*(AvgY-y[a]))
+        a = Start + int(np.argmax(Area))
+        Index[i+1] = a
+    return Index
+
+def Downsample_Index(x, Ys, Threshold):
+    '''
+    Common selection of indices for several y series over the same x (e.g. several output columns
+    over simulation time), so that all of them are plotted over one shared x.
+    Each series gets its share of Threshold through LTTB_Index, and its minimum and maximum are
+    always kept.
+    '''
+    if len(x)<=Threshold:
+        return np.arange(len(x))
+    Index = [LTTB_Index(x, y, max(Threshold//len(Ys), 3)) for y in Ys]
+    for y in Ys:
+        y = np.asarray(y, dtype=np.float64)
+        if not np.isnan(y).all():
+            Index.append([np.nanargmin(y), np.nanargmax(y)])
+    return np.unique(np.concatenate(Index))
+
+def Outputs_Frame(Outputs, Symbol, Unit, Time):
+    '''
+    Materializes the preallocated output columns into the final dfOutputs dataframe at once.
+    Every column is float64 (rounded to 5 significant figures) and indexed by simulation time.
+    Units are kept as column metadata in dfOutputs.attrs['Units'], which maps each symbol (and
+    the TIME index) to its unit, instead of a units row mixed into the numeric columns.
+    '''
+    dfOutputs = pd.DataFrame(
+        {
+            Symbol[col] : round_sig_array(np.broadcast_to(Outputs[col], len(Time)), 5)
+            for col in Symbol.keys()
+        },
+        index = pd.Index(Time, name='TIME')
+    )
+    dfOutputs.attrs['Units'] = {'TIME' : 'min', **{Symbol[col] : Unit[col] for col in Symbol}}
+    return dfOutputs
+
+def With_units(dfOutputs):
+    '''
+    Returns dfOutputs with its units as the first row (as in the previous output format),
+    for display tables and for excel/csv exports.
+    '''
+    Units = dfOutputs.attrs.get('Units', {})
+    dfUnits = pd.DataFrame(
+        [[Units.get(col, '') for col in dfOutputs.columns]],
+        columns = dfOutputs.columns,
+        index = [Units.get(dfOutputs.index.name, '')]
+    )
+    dfIO = pd.concat([dfUnits, dfOutputs.astype(object)])
+    dfIO.index.name = dfOutputs.index.name
+    return dfIO
+
 def Get_Coolant_Property(TEMP_Index, Table):
     [TIndex, TExact] = TEMP_Index
 
@@ -0,0 +1,136 @@
+import math
+import numpy as np
+
+## Optional compiled kernels of the Level 1 / Level 2 hot loops. With Numba installed, the table
+## lookup and the Level 2 Nusselt correlations are compiled loops over the flat (broadcast)
+## arrays, which only evaluate the branch that applies to each point. Without Numba, the same
+## functions are evaluated as NumPy expressions.
+## The Level 1 correlations (Dow, PY1, PY2, dδ/dt) stay NumPy expressions: broadcasting already
+## evaluates the time series terms once per time step, and their cost is the same power
+## functions compiled or not.
+try:
+    import numba
+except ImportError:
+    numba = None
+
+## Set to False to force the NumPy fallback, e.g. to compare both in CC_Benchmark :
+Use_numba = numba is not None
+
+def Nusselt_numpy(RE, PR, L_DH, L, LE):
+    '''
+    Fully developed Nusselt number of CC_Master_L2.Master.Flow_switcher for arrays: laminar
+    (Re <= 2300) entry length correlations, else Gnielinski NuFD,1 with the short pipe correction.
+
+    Output: Three (3) arrays: fo, NuFD,1 (both NaN for laminar flow) and NuFD.
+    '''
+    Laminar = RE<=2300
+    with np.errstate(divide='ignore', invalid='ignore'):
+        Multiplier = RE*PR/L_DH
+        NUFD_laminar = np.where(
+            L>LE,
+            3.657 + ((0.19*(Multiplier**0.8))/(1+0.117*(Multiplier**0.467))),
+            np.where(
+                PR>=5,
+                3.66 + ((0.0668*Multiplier)/(1+0.04*(Multiplier**(2/3)))),
+                1.86*(Multiplier**(1/3))
+            )
+        )
+        F = (0.79*np.log(RE)-1.64)**(-2)
+        NUFD1 = ((F/8)*(RE-1000)*PR)/(1+12.7*((F/8)**0.5)*((PR**(2/3))-1))
+        NUFD_turbulent = np.where(L_DH>=60, NUFD1, NUFD1*(2/(L_DH**(2/3))))
+    return (
+        np.where(Laminar, np.nan, F),
+        np.where(Laminar, np.nan, NUFD1),
+        np.where(Laminar, NUFD_laminar, NUFD_turbulent)
+    )
+
+def Interp_Cells_numpy(PropertyTable, PIndex, TIndex):
+    '''
+    Triangulated interpolation of CC_DataPrep.Interp_Cells, for arrays of fractional PIndex and
+    TIndex that broadcast against each other.
+    '''
+    P0, T0 = np.floor(PIndex).astype(int), np.floor(TIndex).astype(int)
+    P1 = np.minimum(P0+1, PropertyTable.shape[0]-1)
+    T1 = np.minimum(T0+1, PropertyTable.shape[1]-1)
+    X, Y = PIndex-P0, TIndex-T0
+    V00, V11 = PropertyTable[P0, T0], PropertyTable[P1, T1]
+    V10, V01 = PropertyTable[P1, T0], PropertyTable[P0, T1]
+    return np.where(
+        X>=Y,
+        V00 + ((V10 - V00)*X) + ((V11 - V10)*Y),
+        V00 + ((V01 - V00)*Y) + ((V11 - V01)*X)
+    )
+
+if numba is not None:
+
+    ## Compiled on first use, and cached next to this file for the next processes :
+    @numba.njit(cache=True)
+    def Nusselt_loop(RE, PR, L_DH, L, LE, F, NUFD1, NUFD):
+        for i in range(RE.size):
+            if RE[i]<=2300:
+                F[i], NUFD1[i] = np.nan, np.nan
+                Multiplier = RE[i]*PR[i]/L_DH[i]
+                if L[i]>LE[i]:
+                    NUFD[i] = 3.657 + ((0.19*(Multiplier**0.8))/(1+0.117*(Multiplier**0.467)))
+                elif PR[i]>=5:
+                    NUFD[i] = 3.66 + ((0.0668*Multiplier)/(1+0.04*(Multiplier**(2/3))))
+                else:
+                    NUFD[i] = 1.86*(Multiplier**(1/3))
+            else:
+                F[i] = (0.79*np.log(RE[i])-1.64)**(-2)
+                NUFD1[i] = ((F[i]/8)*(RE[i]-1000)*PR[i])/(1+12.7*((F[i]/8)**0.5)*((PR[i]**(2/3))-1))
+                if L_DH[i]>=60:
+                    NUFD[i] = NUFD1[i]
+                else:
+                    NUFD[i] = NUFD1[i]*(2/(L_DH[i]**(2/3)))
+
+    @numba.njit(cache=True)
+    def Interp_Cells_loop(PropertyTable, PIndex, TIndex, Value):
+        NP, NT = PropertyTable.shape
+        for i in range(PIndex.size):
+            P0, T0 = int(math.floor(PIndex[i])), int(math.floor(TIndex[i]))
+            P1, T1 = min(P0+1, NP-1), min(T0+1, NT-1)
+            X, Y = PIndex[i]-P0, TIndex[i]-T0
+            V00, V11 = PropertyTable[P0, T0], PropertyTable[P1, T1]
+            if X>=Y:
+                V10 = PropertyTable[P1, T0]
+                Value[i] = V00 + ((V10 - V00)*X) + ((V11 - V10)*Y)
+            else:
+                V01 = PropertyTable[P0, T1]
+                Value[i] = V00 + ((V01 - V00)*Y) + ((V11 - V01)*X)
+
+def Flat(*Arrays):
+    ## Contiguous flat float64 arrays broadcast to a common shape, for the compiled loops :
+    Arrays = [np.asarray(X, dtype=np.float64) for X in Arrays]
+    Shape = np.broadcast_shapes(*[X.shape for X in Arrays])
+    return Shape, [np.ascontiguousarray(np.broadcast_to(X, Shape)).ravel() for X in Arrays]
+
+def Nusselt(RE, PR, L_DH, L, LE):
+    '''
+    fo, NuFD,1 and NuFD of Nusselt_numpy, compiled when Numba is available.
+    '''
+    if not Use_numba:
+        return Nusselt_numpy(RE, PR, L_DH, L, LE)
+    Shape, Inputs = Flat(RE, PR, L_DH, L, LE)
+    Outputs = [np.empty(Inputs[0].size) for _ in range(3)]
+    Nusselt_loop(*Inputs, *Outputs)
+    return tuple(X.reshape(Shape) for X in Outputs)
+
+def Check_indices(PropertyTable, PIndex, TIndex):
+    ## The compiled loop reads the table without bounds checks, so NaN or out of range indices are
+    ## rejected first, by both paths alike :
+    for Index, N, Axis in [(PIndex, PropertyTable.shape[0], 'P'), (TIndex, PropertyTable.shape[1], 'TEMP')]:
+        if not np.all((Index>=0) & (Index<=N-1)):
+            raise ValueError('{} index outside the table range 0 to {}'.format(Axis, N-1))
+
+def Interp_Cells(PropertyTable, PIndex, TIndex):
+    '''
+    Interp_Cells_numpy, compiled when Numba is available.
+    '''
+    Check_indices(PropertyTable, PIndex, TIndex)
+    if not Use_numba:
+        return Interp_Cells_numpy(PropertyTable, PIndex, TIndex)
+    Shape, (PIndex, TIndex) = Flat(PIndex, TIndex)
+    Value = np.empty(PIndex.size)
+    Interp_Cells_loop(np.ascontiguousarray(PropertyTable), PIndex, TIndex, Value)
+    return Value.reshape(Shape)
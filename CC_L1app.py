@@ -116,6 +116,23 @@ app.layout = html.Div([
                 ),
                 style=buttonstyle,
             ),
+
+            html.Div(
+                html.Div(id='job-status'),
+                style=buttonstyle,
+            ),
+
+            html.Div(
+                dbc.Button('Download results',
+                    id='download-button',
+                    style={'background-color':'darkslategray'}
+                ),
+                style=buttonstyle,
+            ),
+            dcc.Download(id='download-results'),
+            dcc.Store(id='job-id'),
+            dcc.Store(id='session-files', storage_type='session'),
+            dcc.Interval(id='job-poll', interval=500, disabled=True),
         ],
         style={
             'padding': '20px 0px 20px 0px',
@@ -151,6 +168,8 @@ cca.file_upload(app, 'files-upload', 'body-file-list')
 cca.open_modal(app, 'modal-file-list', 'open-file-list', 'close-file-list')
 cca.open_modal(app, 'modal-inputs', 'open-user-inputs', 'close-user-inputs')
 cca.tabs_display(app)
+cca.table_paging(app)
+cca.export_download(app)
 
 if __name__ == '__main__':
     hostname = socket.gethostname()
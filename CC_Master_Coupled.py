@@ -0,0 +1,235 @@
+import math
+import numpy as np
+import pandas as pd
+import CC_DataPrep as ccd
+import CC_Master_L1 as ccm1
+import CC_Master_L2 as ccm2
+
+## Parameters that can differ between the cases of a coupled run, see Master :
+Case_parameters = ['C1', 'C2', 'C3', 'MO', 'MC']
+
+class Master():
+
+    def __init__(
+        self, Files, Cases=None,
+        C1=15, C2=0.055, C3=1.4,
+        PIO=101325,
+        DowMethod='Wilke-Chang',
+        Tolerance=1E-9, Max_iterations=50
+    ):
+        '''
+        Coupled thermal and deposition engine: Level 1 and Level 2 are solved together at each
+        time step, instead of reading Tw, dw and dT/dr from the Level 1 Excel file.
+
+        Files are the TAB and WAX files with the Level 2 Inputs and Coolant files. From the Level 2
+        inputs only To, Tc, di, do, L, mo and mc are used; Tw and dw are calculated.
+
+        At each time step, for all cases at once :
+
+            [1] dw          dw = di - 2δ, from δ of the previous time step (dw = di at the start).
+
+            [2] ɑc          Coolant side heat transfer coefficient, as in Level 2 (Calc_alpha_c).
+
+            [3] Tw          Oil/wax interface temperature. Heat flows from the oil (To) to the
+                            coolant (Tc) through three resistances per unit length in series:
+                                oil film    1/(ɑw π dw), with ɑw of Level 2 at dh = dw and at
+                                            the properties at Tw (Calc_alpha_w),
+                                wax layer   ln(di/dw)/(2π kwax), kwax from the WAX file,
+                                coolant     1/(ɑc π di), thin pipe wall.
+                            Tw = To - (To - Tc) x oil film / total resistance, which depends on
+                            Tw through ɑw. This is solved with a vectorized Illinois (modified
+                            regula falsi) iteration bracketed by Tc and To.
+
+            [4] dT/dr       Oil side wall temperature gradient, ɑw (To - Tw) / kow.
+
+            [5] δ           dδ/dt of Level 1 at Tw, dw and dT/dr (Calc_rates), and δ = δt-1 + dδ/dt.
+                            dt is the time since the previous Level 2 time step, and the Level 1
+                            dt (10 min) for the first one.
+
+        Cases is a dataframe (or list of dictionaries) with one row per case, over any of
+        Case_parameters. Missing parameters take the values given here (C1, C2, C3) or in the
+        Level 2 inputs (mo, mc). Every time step then solves all cases as arrays.
+
+        Outputs :
+            dfOutputs   Long format dataframe with one row per case and time step: Case (row
+                        number in Cases), TIME and the coupled outputs, with units in
+                        dfOutputs.attrs['Units'].
+            Iterations  Number of Illinois iterations of each time step (all cases).
+        '''
+        self.Files = Files
+        self.Tolerance, self.Max_iterations = Tolerance, Max_iterations
+
+        ## Level 1 and Level 2 Masters only prepared, and used for their calculation steps :
+        self.L1 = ccm1.Master(
+            {'tab':Files['tab'], 'wax':Files['wax']},
+            C1=C1, C2=C2, C3=C3, PIO=PIO, DowMethod=DowMethod, Engine='Prepare'
+        )
+        self.L2 = ccm2.Master(
+            {'tab':Files['tab'], 'Inputs.xlsx':Files['Inputs.xlsx'], 'Coolant.xlsx':Files['Coolant.xlsx']},
+            PIO=PIO, Engine='Prepare', Export=False,
+            Tables={
+                'P':self.L1.Table['P_Table_TAB'],
+                'TEMP':self.L1.Table['T_Table_TAB'],
+                'Properties':self.L1.Table['TAB_Properties']
+            }
+        )
+        ## Level 2 input series, coolant properties at Tc and oil properties at To, for all time steps :
+        self.L2.Get_Val_vector()
+        self.Series = dict(self.L2.Val)
+
+        dfCases = pd.DataFrame(Cases if Cases is not None else [{}]).reset_index(drop=True)
+        self.Cases = {
+            PARAM : (
+                dfCases[PARAM].to_numpy(dtype=np.float64)
+                if PARAM in dfCases else
+                np.full(len(dfCases), self.L1.Val[PARAM] if PARAM in ['C1','C2','C3'] else np.nan)
+            )
+            for PARAM in Case_parameters
+        }
+        self.dfCases = dfCases
+
+        self.Run()
+
+    def Run(self):
+        Time = self.Series['TIME']
+        k = len(self.dfCases)
+        Columns = ['TW', 'DW', 'DT_DR', 'ALPHA W', 'ALPHA C', 'DC_DT', 'DDEL_DT', 'DELTA']
+        self.Outputs = {col : np.empty((k, len(Time))) for col in Columns}
+        self.Iterations = np.zeros(len(Time), dtype=int)
+
+        ## Time step dt in seconds of each Level 2 time step :
+        self.DT = np.diff(Time, prepend=Time[0] - self.L1.Val['DT']/60)*60
+
+        ## δ in mm, zero before the first time step :
+        DELTA = np.zeros(k)
+        for i in range(len(Time)):
+            self.Set_step(i)
+            self.Val['DW'] = self.Val['DI'] - 2*DELTA*0.001
+
+            self.L2.Calc_alpha_c()
+            self.Val['ALPHA C'] = self.L2.Val['ALPHA C']
+
+            self.Val['TW'], self.Iterations[i] = self.Solve_TW()
+            self.Wall_temperature(self.Val['TW'])
+            self.Val['DT_DR'] = self.Val['ALPHA W']*(self.Val['TO'] - self.Val['TW'])/self.L2.Val['KOW']
+
+            self.Calc_deposition()
+            DELTA = DELTA + self.L1.Val['DDEL_DT']
+
+            for col, Value in [
+                ('TW', self.Val['TW']), ('DW', self.Val['DW']), ('DT_DR', self.Val['DT_DR']),
+                ('ALPHA W', self.Val['ALPHA W']), ('ALPHA C', self.Val['ALPHA C']),
+                ('DC_DT', self.L1.Val['DC_DT']), ('DDEL_DT', self.L1.Val['DDEL_DT']), ('DELTA', DELTA)
+            ]:
+                self.Outputs[col][:,i] = Value
+
+        self.dfOutputs = self.Outputs_Frame(Time)
+
+    def Set_step(self, i):
+        '''
+        Level 2 inputs of time step i, with the case parameters mo and mc (where given) as arrays.
+        '''
+        self.Val = {Var : self.Series[Var][i] for Var in ['TIME','TO','TC','DI','DO','L','UO','RHOO']}
+        self.Val['DT'] = self.DT[i]
+        self.L2.Val = {Var : Value[i] if np.ndim(Value) else Value for Var, Value in self.Series.items()}
+        for PARAM in ['MO','MC']:
+            self.L2.Val[PARAM] = np.where(np.isnan(self.Cases[PARAM]), self.L2.Val[PARAM], self.Cases[PARAM])
+
+    def Wall_temperature(self, TW):
+        '''
+        Tw resulting from the thermal resistances at a guessed Tw (array over cases).
+        '''
+        self.L2.Val['UOW'], self.L2.Val['RHOOW'], self.L2.Val['CPOW'], self.L2.Val['KOW'] = np.moveaxis(
+            ccd.Get_Properties(
+                self.L2.Val['PIO'], TW, self.L2.Table['P'], self.L2.Table['TEMP'],
+                self.L2.Table['Properties'], ['UOW','RHOOW','CPOW','KOW']
+            ), -1, 0
+        )
+        self.L2.Val['DW'] = self.Val['DW']
+        self.L2.Calc_alpha_w()
+        self.Val['ALPHA W'] = self.L2.Val['ALPHA W']
+
+        KWAX = ccd.Get_Properties(
+            self.L2.Val['PIO'], TW, self.L1.Table['P_Table_WAX'], self.L1.Table['T_Table_WAX'],
+            self.L1.Table['WAX_Properties'], ['KWAX']
+        )[...,0]
+        R_oil = 1/(self.Val['ALPHA W']*math.pi*self.Val['DW'])
+        R_wax = np.log(self.Val['DI']/self.Val['DW'])/(2*math.pi*KWAX)
+        R_coolant = 1/(self.Val['ALPHA C']*math.pi*self.Val['DI'])
+        return self.Val['TO'] - (self.Val['TO'] - self.Val['TC'])*R_oil/(R_oil + R_wax + R_coolant)
+
+    def Solve_TW(self):
+        '''
+        Vectorized Illinois iteration on g(Tw) = Tw - Wall_temperature(Tw), bracketed by Tc
+        (g < 0) and To (g > 0). Cases stop being updated once |g| is below Tolerance.
+
+        Output: Tw of every case, and the number of iterations.
+        '''
+        k = len(self.dfCases)
+        A, B = np.full(k, float(self.Val['TC'])), np.full(k, float(self.Val['TO']))
+        GA, GB = A - self.Wall_temperature(A), B - self.Wall_temperature(B)
+        Side = np.zeros(k, dtype=int)
+        C = A.copy()
+        Active = np.ones(k, dtype=bool)
+        for Iteration in range(1, self.Max_iterations+1):
+            C = np.where(Active, (A*GB - B*GA)/(GB - GA), C)
+            GC = C - self.Wall_temperature(C)
+            Active = Active & (np.abs(GC)>self.Tolerance)
+            if not Active.any():
+                return C, Iteration
+
+            ## Illinois: halving the value at the end point kept twice in a row :
+            Upper = Active & (GC*GB>0)
+            Lower = Active & ~Upper
+            GA = np.where(Upper & (Side==-1), GA/2, GA)
+            GB = np.where(Lower & (Side==1), GB/2, GB)
+            B, GB = np.where(Upper, C, B), np.where(Upper, GC, GB)
+            A, GA = np.where(Lower, C, A), np.where(Lower, GC, GA)
+            Side = np.where(Upper, -1, np.where(Lower, 1, Side))
+        raise ValueError('Tw did not converge within {} iterations at time {}'.format(self.Max_iterations, self.Val['TIME']))
+
+    def Calc_deposition(self):
+        '''
+        Level 1 dδ/dt of all cases at the solved Tw, dw and dT/dr.
+        '''
+        self.L1.Val.update({
+            'TW' : self.Val['TW'], 'DW' : self.Val['DW'], 'DT_DR' : self.Val['DT_DR'],
+            'DI' : self.Val['DI'], 'RHOO' : self.Val['RHOO'], 'MO' : self.L2.Val['MO'], 'DT' : self.Val['DT'],
+            'C1' : self.Cases['C1'], 'C2' : self.Cases['C2'], 'C3' : self.Cases['C3']
+        })
+        self.L1.Get('Properties_Series')
+        self.L1.Calc_rates()
+
+    def Outputs_Frame(self, Time):
+        Symbol = {
+            **{col : ccd.Abbreviations('SymbolL1')[col] for col in ['TW','DW','DT_DR','DC_DT','DDEL_DT','DELTA']},
+            'ALPHA W' : ccd.Abbreviations('SymbolL2Aw')['ALPHA W'],
+            'ALPHA C' : ccd.Abbreviations('SymbolL2Ac')['ALPHA C']
+        }
+        Unit = {
+            **{col : ccd.Abbreviations('UnitL1')[col] for col in ['TW','DW','DT_DR','DC_DT','DDEL_DT','DELTA']},
+            'ALPHA W' : ccd.Abbreviations('UnitL2Aw')['ALPHA W'],
+            'ALPHA C' : ccd.Abbreviations('UnitL2Ac')['ALPHA C']
+        }
+        k = len(self.dfCases)
+        dfOutputs = pd.DataFrame({
+            'Case' : np.repeat(np.arange(k), len(Time)),
+            'TIME' : np.tile(Time, k),
+            **{
+                Symbol[col] : ccd.round_sig_array(self.Outputs[col].ravel(), 5)
+                for col in self.Outputs
+            }
+        })
+        dfOutputs.attrs['Units'] = {'TIME' : 'min', **{Symbol[col] : Unit[col] for col in Symbol}}
+        return dfOutputs
+
+
+if __name__ == '__main__':
+
+    Files = {
+        'tab':'./Files/Dead Oil - Dulang 44 to 35C - OLGA tab - fixed format.tab',
+        'wax':'./Files/Dead Oil - DULANG 44 to 35C - OLGA WAX.wax',
+        'Inputs.xlsx':'./Files/Dataset Level 2 Inputs.xlsx',
+        'Coolant.xlsx':'./Files/Dataset Level 2 Coolant.xlsx'
+    }
+    print(Master(Files).dfOutputs)
@@ -1,9 +1,14 @@
 import os
 import math
+import inspect
+import concurrent.futures
 import numpy as np
 import pandas as pd
 import CC_DataPrep as ccd
 
+## Engines of Master, see Master :
+Engines = ['Loop', 'Vector', 'Prepare']
+
 class Master():
 
     def __init__(
@@ -11,7 +16,9 @@ class Master():
         C1=15, C2=0.055, C3=1.4, 
         DI=0.0446, MO=0.50369, 
         PIO= 101325, TOI=46,
-        DowMethod = 'Wilke-Chang'
+        DowMethod = 'Wilke-Chang',
+        Engine = 'Loop',
+        Tables = None
     ): 
         '''
         Within this Class, we define five (5) Instance Variables:
@@ -24,7 +31,9 @@ class Master():
             [3] dfInputs    Dataframe of input dataset Tw, dw & dT/dr with simulation time as iteration 
                             index from 0 to 300 min with time step of 10 min.
                             
-            [4] dfOutputs   Dataframe of output dataset defined in Symbols attribute.
+            [4] dfOutputs   Dataframe of output dataset defined in Symbols attribute. Values are
+                            accumulated in preallocated float64 columns (Outputs) and the dataframe
+                            is built once at the end, with units in dfOutputs.attrs['Units'].
 
             [5] Files       List of input files (TAB, WAX & Excel files)
 
@@ -37,8 +46,33 @@ class Master():
                             All values will be saved under Val and Table dictionaries.
 
             [2] Calc        Step by step calculation (12 steps) of Wax Loop algorithm
+
+        Three (3) engines are available through Engine (see Engines) :
+
+            [1] 'Loop'      Iterates over the simulation time index, one time step at a time.
+
+            [2] 'Vector'    Evaluates every step except δ for all time steps at once as NumPy arrays
+                            (see Run_vector), then δ as a single cumulative sum. Same outputs as 'Loop'.
+
+            [3] 'Prepare'   Only prepares the run (tables, Pio and Toi indices, ρo and Cwax feed),
+                            and calculates nothing. The run is then left to one of:
+                            [1] Iter_steps      'Loop' engine time steps yielded one at a time.
+                            [2] Update          Live samples given one at a time.
+                            [3] Run_segments    Pipeline split in segments along its length.
+                            [4] Run_adaptive    δ(t) with error-controlled time steps.
+                            [5] Run_samples     Batches of sampled parameters (see Monte_Carlo).
+                            [6] CC_Master_Coupled, which sets Tw, dw and dT/dr of every time
+                                step and calls Calc_rates.
+                            The Excel file can be left out of Files, except for Iter_steps and
+                            Run_samples (and for Run_adaptive without its own inputs).
+
+        Tables takes the Table dictionary of a previous Master, so that the TAB and WAX files are
+        not loaded again (see Sweep).
             
         '''
+        if Engine not in Engines:
+            raise ValueError('Unknown Engine {!r}, expected one of {}'.format(Engine, Engines))
+
         if os.path.isfile('./printout.txt'):
             os.remove('./printout.txt')
 
@@ -50,14 +84,14 @@ class Master():
             'DOWMethod':DowMethod
         }
 
-        ## Creating Table empty dictionary :
-        self.Table = {}
+        ## Creating Table dictionary, empty unless already loaded tables are given :
+        self.Table = {} if Tables is None else dict(Tables)
 
         ## Converting the user defined input file names as instance variable list :
         self.Files = Files
 
-        ## Creating dfOutput empty dataframe :
-        self.dfOutputs = pd.DataFrame()
+        ## Creating Outputs empty dictionary of output columns :
+        self.Outputs = {}
 
         ## Reading from the TAB and WAX files :
         self.Get('From Input Files')
@@ -73,53 +107,342 @@ class Master():
         ## Acquiring Total Wax Conc in Feed from TAB properties table :
         self.Get('CWAXFEED')
 
+        ## δ and dt before the first time step :
+        self.Initial_state()
+
+        if Engine=='Vector':
+            self.Run_vector()
+            self.Build_outputs(len(self.dfInputs))
+        elif Engine=='Loop':
+            for Step in self.Iter_steps():
+                pass
+
+    def Initial_state(self):
         ## For iteration #1 we assume δt-1 is zero :
         self.Val['DELTA'] = 0
 
-        for Iteration, Time in enumerate(self.dfInputs.index.values):
-            self.Val['Iteration'] = Iteration + 1
-            self.Val['TIME'] = Time
-
-            ## Acquiring Tw, dw and dT/dr from dfInputs dataframe :
-            self.Get('TW')
-            self.Get('DW')
-            self.Get('DT_DR')
-
-            ## δt-1 is equal to δ of previous iteration :
-            self.Get('DELTA_TMINUS1')
-
-            ## Transform Tw into index numbers according on TAB and WAX Pressure and Temperature tables :
-            self.Get('TW_TABIndex')            
-            self.Get('TW_WAXIndex') 
-
-            ## Acquiring ρow and μow from TAB properties using Pio and Tw as index pointer :
-            self.Get('RHOOW')
-            self.Get('UOW')
-
-            ## Acquiring MWww, MWow, ρww and dC/dT from WAX properties using Pio and Tw as index pointer :
-            self.Get('MWWW')            
-            self.Get('MWOW')            
-            self.Get('RHOWW')            
-            self.Get('DC_DT')
-
-            ## Step by step calculation (12 steps) of Wax Loop algorithm :
-            self.Calc('VO')
-            self.Calc('DELD')
-            self.Calc('NSR')
-            self.Calc('REOW')
-            self.Calc('FO')
-            self.Calc('FW')
-            self.Calc('PY1')
-            self.Calc('PY2')
-            self.Calc('MVWW')
-            self.Calc('DOW')
-            self.Calc('DDEL_DT')
-            self.Calc('DELTA')
-
-            ## Updating dfOutputs entry of current iteration :
-            self.Save_outputs()
-            
-        self.dfOutputs.index.name = 'TIME'
+        ## Time step dt in seconds, 10 min as in the input dataset :
+        self.Val['DT'] = 10*60
+
+    def Iter_steps(self, Stop=None):
+        '''
+        Generator of the 'Loop' engine, yielding the outputs of each time step as soon as it is
+        calculated: dictionary that maps the output abbreviations (as in SymbolL1) to their values.
+        With Engine='Prepare', nothing is calculated by __init__, and the caller iterates over
+        Iter_steps itself, e.g. to plot δ(t) while it grows.
+
+        Stop is an optional function of the step outputs, e.g. lambda Step: Step['DELTA']>=0.5 for
+        a pigging threshold, ending the run after the first step where it returns True.
+        Once the run ends (or the caller stops iterating), dfOutputs holds the calculated time steps.
+        Every iteration starts again from δ = 0 at the first time step.
+        '''
+        Symbol = ccd.Abbreviations('SymbolL1')
+        self.Initial_state()
+        Iteration = 0
+        try:
+            for Iteration, Time in enumerate(self.dfInputs.index.values, start=1):
+                self.Val['Iteration'] = Iteration
+                self.Val['TIME'] = Time
+                self.Step()
+
+                ## Updating Outputs entry of current iteration :
+                self.Save_outputs()
+                Step = {col : self.Val[col] for col in Symbol}
+                yield Step
+                if Stop is not None and Stop(Step):
+                    break
+        finally:
+            self.Build_outputs(Iteration)
+
+    def Step(self):
+        '''
+        Calculation of a single time step at Val['TIME'], from the outputs of the previous one.
+        '''
+        ## Acquiring Tw, dw and dT/dr from dfInputs dataframe :
+        self.Get('TW')
+        self.Get('DW')
+        self.Get('DT_DR')
+
+        self.Step_sample()
+
+    def Update(self, Time, TW, DW, DT_DR):
+        '''
+        Online mode (Engine='Prepare'): updates δ with a single live sample of Tw (°C), dw (mm) and
+        dT/dr (K/m) taken at simulation time Time (min), instead of a dfInputs row.
+        Only the running state (previous time and δ) is kept, so each update costs the same
+        whatever the number of samples so far.
+        dt is the time since the previous sample, and 10 min for the first sample.
+
+        Output: Dictionary that maps the output abbreviations (as in SymbolL1) to their values.
+        '''
+        if 'TIME' in self.Val:
+            if Time<=self.Val['TIME']:
+                raise ValueError('Sample time {} is not after the previous sample time {}'.format(Time, self.Val['TIME']))
+            ## Converting dt from minutes to seconds :
+            self.Val['DT'] = (Time - self.Val['TIME'])*60
+        self.Val['TIME'] = Time
+        self.Val['TW'] = TW
+        ## Converting dw from mm to m :
+        self.Val['DW'] = DW * 0.001
+        self.Val['DT_DR'] = DT_DR
+
+        self.Step_sample()
+        return {col : self.Val[col] for col in ccd.Abbreviations('SymbolL1')}
+
+    def Step_sample(self):
+        '''
+        Remaining calculation of a time step, once Tw, dw and dT/dr are acquired.
+        '''
+        ## δt-1 is equal to δ of previous iteration :
+        self.Get('DELTA_TMINUS1')
+
+        ## Transform Tw into index numbers according on TAB and WAX Pressure and Temperature tables :
+        self.Get('TW_TABIndex')            
+        self.Get('TW_WAXIndex') 
+
+        ## Acquiring ρow and μow from TAB properties using Pio and Tw as index pointer :
+        self.Get('RHOOW')
+        self.Get('UOW')
+
+        ## Acquiring MWww, MWow, ρww and dC/dT from WAX properties using Pio and Tw as index pointer :
+        self.Get('MWWW')            
+        self.Get('MWOW')            
+        self.Get('RHOWW')            
+        self.Get('DC_DT')
+
+        ## Step by step calculation (12 steps) of Wax Loop algorithm :
+        self.Calc('VO')
+        self.Calc('DELD')
+        self.Calc('NSR')
+        self.Calc('REOW')
+        self.Calc('FO')
+        self.Calc('FW')
+        self.Calc('PY1')
+        self.Calc('PY2')
+        self.Calc('MVWW')
+        self.Calc('DOW')
+        self.Calc('DDEL_DT')
+        self.Calc('DELTA')
+
+    def Build_outputs(self, Steps):
+        ## Building dfOutputs dataframe from Outputs columns of the first Steps time steps :
+        Symbol = ccd.Abbreviations('SymbolL1')
+        Outputs = {}
+        for col in Symbol:
+            Value = self.Outputs.get(col, np.nan)
+            Outputs[col] = Value[:Steps] if np.ndim(Value) else Value
+        self.dfOutputs = ccd.Outputs_Frame(
+            Outputs, Symbol, ccd.Abbreviations('UnitL1'), self.dfInputs.index.values[:Steps]
+        )
+
+    def Run_vector(self):
+        '''
+        Vectorized engine over the whole time series. Every Val entry acquired per time step
+        in the 'Loop' engine is acquired here as an array over all time steps. Since Calc only
+        uses array-safe arithmetic, the same 12 steps then evaluate all time steps at once.
+        δ is the only step depending on the previous time step, which is a cumulative sum of dδ/dt.
+        '''
+        self.Val['TIME'] = self.dfInputs.index.values
+
+        ## Acquiring Tw, dw and dT/dr series from dfInputs dataframe :
+        self.Get('TW_Series')
+        self.Get('DW_Series')
+        self.Get('DT_DR_Series')
+
+        ## Acquiring ρow, μow, MWww, MWow, ρww and dC/dT series using Pio and Tw series :
+        self.Get('Properties_Series')
+
+        self.Calc_series()
+
+        ## Every output column is already a full array (or a constant) :
+        self.Outputs = {col : self.Val[col] for col in ccd.Abbreviations('SymbolL1')}
+
+    def Run_segments(self, Time, TW, DW, DT_DR, P):
+        '''
+        Vectorized engine over pipeline segments and time steps at once (Engine='Prepare').
+        Each Val entry of Run_vector becomes a (segments x time steps) array:
+            Time    Simulation time (min), array of time steps.
+            TW      Tw (°C) of each segment at each time step.
+            DW      dw (mm), same shape as TW, or a time series shared by all segments.
+            DT_DR   dT/dr (K/m), same shape as TW.
+            P       Pio (Pa) of each segment, array of segments.
+        Properties of all segments and time steps are interpolated with one Get_Properties call per
+        file, and ρo with one call at (P, Toi). δ accumulates over the time axis of each segment.
+        '''
+        P = np.asarray(P, dtype=np.float64)
+        self.Val['TIME'] = np.asarray(Time)
+        self.Val['PIO'] = P[:,np.newaxis]
+        self.Val['TW'] = np.asarray(TW, dtype=np.float64)
+        ## Converting dw from mm to m :
+        self.Val['DW'] = np.asarray(DW, dtype=np.float64) * 0.001
+        self.Val['DT_DR'] = np.asarray(DT_DR, dtype=np.float64)
+
+        ## ρo of each segment, at its own Pio and Toi :
+        self.Val['RHOO'] = ccd.Get_Properties(
+            P, self.Val['TOI'], self.Table['P_Table_TAB'], self.Table['T_Table_TAB'],
+            self.Table['TAB_Properties'], ['RHOOW']
+        )
+
+        self.Get('Properties_Series')
+        self.Calc_series()
+
+    def Run_adaptive(
+        self, Time=None, TW=None, DW=None, DT_DR=None, Output=None,
+        Atol=1E-6, Rtol=1E-6, First_step=None, Max_step=None
+    ):
+        '''
+        Error-controlled integration of δ(t) (Engine='Prepare'), instead of one fixed dt per input row.
+            Time        Simulation time (min) of the input samples, increasing but not evenly spaced.
+            TW          Tw (°C), DW dw (mm) and DT_DR dT/dr (K/m) at Time, linearly interpolated
+            DW          in between. All four default to the Excel input dataset.
+            DT_DR
+            Output      Simulation times (min) of dfOutputs, Time by default.
+            Atol, Rtol  Absolute (mm) and relative error allowed on δ at each step.
+            First_step  Initial step (min), dt of the fixed step engines by default.
+            Max_step    Largest step (min), the whole run by default. A step much longer than the
+                        sample spacing only sees the inputs at its own stages, so Max_step should be
+                        set for inputs with short events.
+
+        δ is integrated from 0 at the first timestamp with the Bogacki-Shampine 3(2) pair: each step
+        compares the 3rd and 2nd order estimates of δ, and is rejected and shrunk when the difference
+        is above Atol + Rtol x |δ|, else the next step grows (up to x5) while dδ/dt stays flat.
+        Since dw is an input, dδ/dt only depends on time and all stages of a step are evaluated
+        in one vector call. δ between steps is the cubic Hermite interpolant of the step ends.
+
+        Note that the fixed step engines sum dδ/dt x dt over the input rows, including a full dt at
+        the first row, so their δ is ahead of this integral by about one step of dδ/dt.
+
+        Output: Dictionary of the integrator statistics, also kept as Integrator:
+                [1] Steps           Number of accepted steps.
+                [2] Rejected        Number of rejected steps.
+                [3] Evaluations     Number of dδ/dt evaluations.
+                [4] Error           Sum of the local error estimates of the accepted steps (mm),
+                                    an estimate of the error on δ at the end of the run.
+                [5] Max_error       Largest local error estimate (mm).
+                [6] Step_times      Simulation times (min) of the accepted step ends.
+        '''
+        if Time is None:
+            Time, TW = self.dfInputs.index.values, self.dfInputs['Tw'].to_numpy()
+            DW, DT_DR = self.dfInputs['dw'].to_numpy(), self.dfInputs['dT/dr'].to_numpy()
+        Time = np.asarray(Time, dtype=np.float64)
+        if np.any(np.diff(Time)<=0):
+            raise ValueError('Input timestamps must be increasing')
+        Inputs = [np.asarray(X, dtype=np.float64) for X in [TW, DW, DT_DR]]
+        Output = Time if Output is None else np.asarray(Output, dtype=np.float64)
+        Start, End = Time[0], Time[-1]
+        Max_step = End-Start if Max_step is None else Max_step
+        Step = min(self.Val['DT']/60 if First_step is None else First_step, Max_step)
+        Evaluations = [0]
+
+        def Interpolate(T):
+            ## Tw, dw (mm to m) and dT/dr at times T :
+            self.Val['TW'], DW, self.Val['DT_DR'] = [np.interp(T, Time, X) for X in Inputs]
+            self.Val['DW'] = DW * 0.001
+
+        def Rate(T):
+            ## dδ/dt in mm/min at times T, from the rate of a dt long step :
+            Interpolate(T)
+            self.Get('Properties_Series')
+            self.Calc_rates()
+            Evaluations[0] += np.size(T)
+            return self.Val['DDEL_DT'] / (self.Val['DT']/60)
+
+        T, Y, F = Start, 0.0, Rate(np.array([Start]))[0]
+        Times, Deltas, Rates = [T], [Y], [F]
+        Rejected, Error, Max_error = 0, 0.0, 0.0
+        while T<End:
+            Step = min(Step, End-T)
+            K2, K3, K4 = Rate(T + Step*np.array([0.5, 0.75, 1.0]))
+            Y3 = Y + Step*(2/9*F + 1/3*K2 + 4/9*K3)
+            Y2 = Y + Step*(7/24*F + 1/4*K2 + 1/3*K3 + 1/8*K4)
+            Local = abs(Y3-Y2)
+            Scale = Atol + Rtol*abs(Y3)
+            if Local<=Scale:
+                T, Y, F = T+Step, Y3, K4
+                Times.append(T); Deltas.append(Y); Rates.append(F)
+                Error += Local
+                Max_error = max(Max_error, Local)
+            else:
+                Rejected += 1
+            ## Step size of a 3rd order pair, with 0.9 as safety factor :
+            Factor = 5 if Local==0 else min(5, max(0.2, 0.9*(Scale/Local)**(1/3)))
+            Step = min(Step*Factor, Max_step)
+
+        ## Outputs at Output times, with δ from the cubic Hermite interpolant of the accepted steps :
+        Times, Deltas, Rates = np.array(Times), np.array(Deltas), np.array(Rates)
+        i = np.clip(np.searchsorted(Times, Output, side='right')-1, 0, len(Times)-2) if len(Times)>1 else 0
+        H = Times[np.minimum(i+1, len(Times)-1)] - Times[i]
+        S = np.divide(Output - Times[i], H, out=np.zeros_like(Output), where=H>0)
+        DELTA = (
+            (2*S**3 - 3*S**2 + 1)*Deltas[i] + (S**3 - 2*S**2 + S)*H*Rates[i]
+            + (-2*S**3 + 3*S**2)*Deltas[np.minimum(i+1, len(Times)-1)] + (S**3 - S**2)*H*Rates[np.minimum(i+1, len(Times)-1)]
+        )
+
+        self.Val['TIME'] = Output
+        Interpolate(Output)
+        self.Get('Properties_Series')
+        self.Calc_rates()
+        self.Val['DELTA'] = DELTA
+        Symbol = ccd.Abbreviations('SymbolL1')
+        self.Outputs = {col : self.Val[col] for col in Symbol}
+        self.dfOutputs = ccd.Outputs_Frame(self.Outputs, Symbol, ccd.Abbreviations('UnitL1'), Output)
+
+        self.Integrator = {
+            'Steps' : len(Times)-1, 'Rejected' : Rejected, 'Evaluations' : Evaluations[0],
+            'Error' : Error, 'Max_error' : Max_error, 'Step_times' : Times
+        }
+        return self.Integrator
+
+    def Run_samples(self, Draws):
+        '''
+        Vectorized engine over Monte Carlo samples and time steps at once (Engine='Prepare').
+        Draws maps each of Uncertain_parameters to an array of n sampled values: C1, C2, C3, mo and
+        Toi replace the Master values, and TW is an offset (°C) added to the whole Tw series.
+        As in Run_segments, every Val entry becomes a (n x time steps) array, δ included.
+        '''
+        self.Val['TIME'] = self.dfInputs.index.values
+        self.Get('TW_Series')
+        self.Get('DW_Series')
+        self.Get('DT_DR_Series')
+        self.Val['TW'] = self.Val['TW'] + Draws['TW'][:,np.newaxis]
+
+        ## ρo of each sample, at Pio and its own Toi :
+        self.Val['RHOO'] = ccd.Get_Properties(
+            self.Val['PIO'], Draws['TOI'][:,np.newaxis], self.Table['P_Table_TAB'], self.Table['T_Table_TAB'],
+            self.Table['TAB_Properties'], ['RHOOW']
+        )[...,0]
+        for PARAM in ['C1','C2','C3','MO']:
+            self.Val[PARAM] = Draws[PARAM][:,np.newaxis]
+
+        self.Get('Properties_Series')
+        self.Calc_series()
+
+    def Calc_series(self):
+        '''
+        Step by step calculation of Wax Loop algorithm, for all time steps at once, from the
+        series acquired by Run_vector. Parameters given as (k x 1) arrays broadcast against the
+        time series, which gives (k x time steps) arrays for k parameter sets (see Sweep).
+        '''
+        self.Calc_rates()
+        ## δ = δt-1 + dδ/dt accumulated over all time steps, with δ of iteration #1 as 0 + dδ/dt :
+        self.Val['DELTA'] = np.cumsum(self.Val['DDEL_DT'], axis=-1)
+
+    def Calc_rates(self):
+        '''
+        Calculation steps of Wax Loop algorithm up to dδ/dt, for any array shape of the acquired
+        values (see also CC_Master_Coupled).
+        '''
+        self.Calc('VO')
+        self.Calc('DELD')
+        self.Calc('NSR')
+        self.Calc('REOW')
+        self.Calc('FO')
+        self.Calc('FW')
+        self.Calc('PY1')
+        self.Calc('PY2')
+        self.Calc('MVWW')
+        self.Calc('DOW')
+        self.Calc('DDEL_DT')
 
     def Calc(self,func):
 
@@ -127,7 +450,7 @@ class Master():
             ## Using given mo, we first calculate Qo :
             self.Val['QO'] = self.Val['MO'] / self.Val['RHOO']
             ## Then calculating Vo, using area of circle [A = π x (dw/2)²] of the current iteration :
-            self.Val['VO'] = self.Val['QO'] / (math.pi*math.pow(self.Val['DW']/2,2))
+            self.Val['VO'] = self.Val['QO'] / (math.pi*np.power(self.Val['DW']/2,2))
 
         elif func=='DELD':
             self.Val['DELD'] = 0.5*(self.Val['DI'] - self.Val['DW'])
@@ -162,13 +485,13 @@ class Master():
             UOW = self.Val['UOW'] * 1000
 
             if self.Val['DOWMethod']=='Wilke-Chang':
-                self.Val['DOW'] = 7.4E-12 * ((TW*math.pow(self.Val['MWOW'],0.5))/(UOW*math.pow(self.Val['MVWW'],0.6)))
+                self.Val['DOW'] = 7.4E-12 * ((TW*np.power(self.Val['MWOW'],0.5))/(UOW*np.power(self.Val['MVWW'],0.6)))
             elif self.Val['DOWMethod']=='Hayduk-Minhass':
-                self.Val['DOW'] = 13.3E-12 * ((math.pow(TW,1.47)*math.pow(UOW,(10.2/self.Val['MVWW'])-0.791))/math.pow(self.Val['MVWW'],0.71))
+                self.Val['DOW'] = 13.3E-12 * ((np.power(TW,1.47)*np.power(UOW,(10.2/self.Val['MVWW'])-0.791))/np.power(self.Val['MVWW'],0.71))
 
         elif func=='DDEL_DT':
             ## We incorporate also dt in seconds (from minutes) since the expected output is in mm, not mm/s
-            DDEL_DT = (self.Val['PY1']/(1+self.Val['PY2']))*self.Val['DOW']*(self.Val['DC_DT']*self.Val['DT_DR'])* (10*60)
+            DDEL_DT = (self.Val['PY1']/(1+self.Val['PY2']))*self.Val['DOW']*(self.Val['DC_DT']*self.Val['DT_DR'])* self.Val['DT']
             ## Converting dδ/dt from m to mm
             self.Val['DDEL_DT'] = DDEL_DT * 1000
 
@@ -180,17 +503,17 @@ class Master():
         if var=='From Input Files':
             '''
             From TAB file :
-                [1] Pressure table      Dictionary that maps to all 50 Pressure points.
-                [2] Temperature table   Dictionary that maps to all 50 Temperature points.
-                [3] TAB properties      Two-level dictionaries that maps property values at 
+                [1] Pressure table      Sorted array of all 50 Pressure points.
+                [2] Temperature table   Sorted array of all 50 Temperature points.
+                [3] TAB properties      Dictionary of (50 x 50) arrays that maps property values at
                                         each pressure and temperature point.
                                         [1] Liquid/oil Density. 
                                         [2] Liquid/oil Viscosity.
 
             From WAX file :
-                [1] Pressure table      Dictionary that maps to all 30 Pressure points.
-                [2] Temperature table   Dictionary that maps to all 30 Temperature points.
-                [3] WAX properties      Two-level dictionaries that maps property values at 
+                [1] Pressure table      Sorted array of all 30 Pressure points.
+                [2] Temperature table   Sorted array of all 30 Temperature points.
+                [3] WAX properties      Dictionary of (30 x 30) array views that maps property values at
                                         each pressure and temperature point.
                                         [1] Wax concentration. 
                                         [2] Wax density.
@@ -199,9 +522,14 @@ class Master():
 
             From Excel file : Tw, dw, and dT/dr values at each simulation time index.
             '''
-            self.Table['P_Table_TAB'], self.Table['T_Table_TAB'], self.Table['TAB_Properties'] = ccd.Get_File_Inputs(self.Files['tab'],'tab')
-            self.Table['P_Table_WAX'], self.Table['T_Table_WAX'], self.Table['WAX_Properties'] = ccd.Get_File_Inputs(self.Files['wax'],'wax')
-            self.dfInputs = ccd.Get_File_Inputs(self.Files['xlsx'],'xlsx')
+            if not self.Table:
+                self.Table['P_Table_TAB'], self.Table['T_Table_TAB'], self.Table['TAB_Properties'] = ccd.Get_File_Inputs(self.Files['tab'],'tab')
+                self.Table['P_Table_WAX'], self.Table['T_Table_WAX'], self.Table['WAX_Properties'] = ccd.Get_File_Inputs(self.Files['wax'],'wax')
+            if 'xlsx' in self.Files:
+                self.dfInputs = ccd.Get_File_Inputs(self.Files['xlsx'],'xlsx')
+            else:
+                ## Online mode, samples are given one at a time to Update :
+                self.dfInputs = pd.DataFrame(columns=['Tw','dw','dT/dr'], index=pd.Index([], name='Time'))
         
         elif var=='PIO_TABIndex':
             self.Val['PIO_TABIndex'] = ccd.P_TEMP_Index(self.Table['P_Table_TAB'], self.Val['PIO'])
@@ -227,6 +555,31 @@ class Master():
         elif var=='DT_DR':
             self.Val['DT_DR'] = self.dfInputs.loc[self.Val['TIME'],'dT/dr']
 
+        elif var=='TW_Series':
+            self.Val['TW'] = self.dfInputs['Tw'].to_numpy(dtype=np.float64)
+
+        elif var=='DW_Series':
+            ## Converting dw from mm to m :
+            self.Val['DW'] = self.dfInputs['dw'].to_numpy(dtype=np.float64) * 0.001
+
+        elif var=='DT_DR_Series':
+            self.Val['DT_DR'] = self.dfInputs['dT/dr'].to_numpy(dtype=np.float64)
+
+        elif var=='Properties_Series':
+            ## Property axis moved first, so that the series keep the shape of Tw (1D or 2D) :
+            self.Val['RHOOW'], self.Val['UOW'] = np.moveaxis(ccd.Get_Properties(
+                self.Val['PIO'], self.Val['TW'], self.Table['P_Table_TAB'], self.Table['T_Table_TAB'],
+                self.Table['TAB_Properties'], ['RHOOW','UOW']
+            ), -1, 0)
+            self.Val['MWWW'], self.Val['MWOW'], self.Val['RHOWW'] = np.moveaxis(ccd.Get_Properties(
+                self.Val['PIO'], self.Val['TW'], self.Table['P_Table_WAX'], self.Table['T_Table_WAX'],
+                self.Table['WAX_Properties'], ['MWWW','MWOW','RHOWW']
+            ), -1, 0)
+            self.Val['DC_DT'] = ccd.Find_DC_DTs(
+                self.Val['PIO'], self.Val['TW'], self.Table['P_Table_WAX'], self.Table['T_Table_WAX'],
+                self.Table['WAX_Properties']
+            )
+
         elif var=='DELTA_TMINUS1':
             self.Val['DELTA_TMINUS1'] = self.Val['DELTA']
 
@@ -266,15 +619,271 @@ class Master():
 
         elif var=='DC_DT':
             self.Val['DC_DT'] = ccd.Find_DC_DT(
-                self.Val['PIO_WAXIndex'], self.Val['TW_WAXIndex'], self.Table['T_Table_WAX'], 
-                self.Table['WAX_Properties']['CWAX'], self.Val['CWAXFEED']
+                self.Val['PIO_WAXIndex'], self.Val['TW_WAXIndex'], self.Table['WAX_Properties']
             )
         
     def Save_outputs(self):
-        Unit = ccd.Abbreviations('Unit')
-        Symbol = ccd.Abbreviations('Symbol')
+        Symbol = ccd.Abbreviations('SymbolL1')
+
+        ## Preallocating one float64 column per output variable, sized from dfInputs :
+        if self.Val['Iteration']==1:
+            self.Outputs = {col : np.full(len(self.dfInputs), np.nan) for col in Symbol.keys()}
 
         for col in Symbol.keys():
-            if self.Val['Iteration']==1:
-                self.dfOutputs.loc['min', Symbol[col]] = Unit[col]
-            self.dfOutputs.loc[self.Val['TIME'], Symbol[col]] = ccd.round_sig(self.Val[col],5)
+            self.Outputs[col][self.Val['Iteration']-1] = self.Val[col]
+
+
+## Parameters of Master that can be swept, see Sweep :
+Sweep_parameters = ['C1', 'C2', 'C3', 'DI', 'MO', 'PIO', 'TOI', 'DowMethod']
+
+def Sweep_grid(**Values):
+    '''
+    Full grid of parameter sets, e.g. Sweep_grid(C1=[10,15,20], DowMethod=['Wilke-Chang','Hayduk-Minhass']),
+    as a dataframe with one row per combination, to be used as Sweep Params.
+    '''
+    return pd.MultiIndex.from_product(list(Values.values()), names=list(Values)).to_frame(index=False)
+
+def Sweep(Files, Params):
+    '''
+    Evaluates δ(t) of many Level 1 parameter sets with the vectorized engine, sharing the parsed
+    TAB, WAX and Excel inputs between all of them.
+
+    Params is a dataframe (or a list of dictionaries) with one row per parameter set, over any of
+    Sweep_parameters. Missing parameters take the Master defaults.
+    Pio, Toi and the Dow method change the property series, so parameter sets are grouped by them:
+    one Master per group acquires the series once, then C1, C2, C3, di and mo of the whole group
+    are evaluated at once as (k x 1) arrays by Calc_series.
+
+    Output: Long format dataframe with one row per parameter set and time step:
+            Set (row number in Params), the parameters, TIME and DELTA (δ in mm, rounded as in
+            dfOutputs).
+    '''
+    Defaults = inspect.signature(Master).parameters
+    dfParams = pd.DataFrame(Params).reset_index(drop=True)
+    ## Missing columns, and missing cells of sets given with fewer keys, take the Master defaults :
+    for PARAM in Sweep_parameters:
+        if PARAM not in dfParams:
+            dfParams[PARAM] = Defaults[PARAM].default
+        else:
+            dfParams[PARAM] = dfParams[PARAM].fillna(Defaults[PARAM].default)
+    dfParams = dfParams[Sweep_parameters]
+
+    ## Excel inputs are read only once, and passed on as a dataframe :
+    Files = {**Files, 'xlsx' : ccd.Get_File_Inputs(Files['xlsx'],'xlsx')}
+    Time = Files['xlsx'].index.values
+    Tables = None
+    DELTA = np.empty((len(dfParams), len(Time)))
+
+    for (PIO, TOI, DowMethod), dfGroup in dfParams.groupby(['PIO','TOI','DowMethod'], sort=False):
+        Group = Master(Files, PIO=PIO, TOI=TOI, DowMethod=DowMethod, Engine='Vector', Tables=Tables)
+        Tables = Group.Table
+        ## (k x 1) arrays of the group parameters, broadcast against the property series :
+        for PARAM in ['C1','C2','C3','DI','MO']:
+            Group.Val[PARAM] = dfGroup[PARAM].to_numpy(dtype=np.float64)[:,np.newaxis]
+        ## ρo and the property series only depend on Pio, Toi and Tw, so they are shared by the group :
+        Group.Calc_series()
+        DELTA[dfGroup.index.values] = np.broadcast_to(Group.Val['DELTA'], (len(dfGroup), len(Time)))
+
+    dfSweep = dfParams.loc[np.repeat(dfParams.index.values, len(Time))].reset_index(names='Set')
+    dfSweep['TIME'] = np.tile(Time, len(dfParams))
+    dfSweep['DELTA'] = ccd.round_sig_array(DELTA.ravel(), 5)
+    dfSweep.attrs['Units'] = {'TIME' : 'min', 'DELTA' : 'mm'}
+    return dfSweep
+
+def Calibrate(Files, Measured=None, Fit=('C1','C2','C3'), **Params):
+    '''
+    Least squares fit of the deposition constants in Fit (any of C1, C2 and C3) to a measured δ(t),
+    with scipy.optimize.least_squares. Params are the other Master parameters, kept constant; the
+    fit starts from the given (or default) values of the fitted constants.
+
+    Measured is a series of δ in mm indexed by simulation time (any subset of the input time
+    steps), and defaults to the 'Del' column of the Excel input file.
+    The property series are acquired once by a vectorized Master, so every objective evaluation
+    is only Calc_series over the time series.
+
+    Output: Two (2) outputs:
+            [1] Fitted      Dictionary of the fitted constants, RMSE of δ (mm), number of objective
+                            evaluations, success flag and solver message.
+            [2] dfFit       Dataframe of measured and fitted δ (mm) at the measured time steps.
+    '''
+    ## scipy is only required for calibration :
+    from scipy.optimize import least_squares
+
+    Defaults = inspect.signature(Master).parameters
+    Files = {**Files, 'xlsx' : ccd.Get_File_Inputs(Files['xlsx'],'xlsx')}
+    if Measured is None:
+        Measured = Files['xlsx']['Del']
+    Measured = Measured.dropna()
+
+    Run = Master(Files, Engine='Vector', **Params)
+    Points = Files['xlsx'].index.get_indexer(Measured.index)
+    if (Points<0).any():
+        raise ValueError('Measured time steps not found in the input time series')
+
+    def Residuals(x):
+        Run.Val.update(dict(zip(Fit, x)))
+        Run.Calc_series()
+        return Run.Val['DELTA'][Points] - Measured.to_numpy(dtype=np.float64)
+
+    x0 = np.array([Params.get(PARAM, Defaults[PARAM].default) for PARAM in Fit], dtype=np.float64)
+    ## Scale of each constant is its start value, and 1 for a zero start (x_scale must be positive) :
+    Result = least_squares(Residuals, x0, bounds=(0, np.inf), x_scale=np.where(x0!=0, np.abs(x0), 1.0))
+
+    Fitted = {
+        **dict(zip(Fit, Result.x)),
+        'RMSE' : float(np.sqrt(np.mean(Result.fun**2))),
+        'Evaluations' : Result.nfev,
+        'Success' : Result.success,
+        'Message' : Result.message
+    }
+    ## Evaluating δ once more at the fitted constants :
+    Residuals(Result.x)
+    dfFit = pd.DataFrame(
+        {'Measured' : Measured.to_numpy(dtype=np.float64), 'DELTA' : Run.Val['DELTA'][Points]},
+        index = pd.Index(Measured.index.values, name='TIME')
+    )
+    dfFit.attrs['Units'] = {'TIME' : 'min', 'Measured' : 'mm', 'DELTA' : 'mm'}
+    return Fitted, dfFit
+
+## Parameters of Master that can be uncertain, see Monte_Carlo (TW is an offset of the Tw series) :
+Uncertain_parameters = ['C1', 'C2', 'C3', 'MO', 'TOI', 'TW']
+
+def Monte_Carlo_draws(Generator, Size, Means, Uncertainty):
+    '''
+    Normal draws of Uncertain_parameters, always in the same order so that a seed gives the same
+    samples whichever parameters are uncertain. C1, C2, C3 and mo are redrawn until positive.
+    '''
+    Draws = {}
+    for PARAM in Uncertain_parameters:
+        Value = Generator.normal(Means[PARAM], Uncertainty.get(PARAM, 0), Size)
+        if PARAM in ['C1','C2','C3','MO'] and Uncertainty.get(PARAM, 0):
+            while (Value<=0).any():
+                Value[Value<=0] = Generator.normal(Means[PARAM], Uncertainty[PARAM], (Value<=0).sum())
+        Draws[PARAM] = Value
+    return Draws
+
+def Monte_Carlo_batch(Files, Tables, Params, Means, Uncertainty, Seed, Size):
+    '''
+    Single batch of Monte_Carlo, from its own SeedSequence, in the calling or in a worker process.
+
+    Output: Two (2) outputs: dictionary of the drawn parameters, and (Size x time steps) δ array.
+    '''
+    Draws = Monte_Carlo_draws(np.random.default_rng(Seed), Size, Means, Uncertainty)
+    Run = Master(Files, Engine='Prepare', Tables=Tables, **Params)
+    Run.Run_samples(Draws)
+    return Draws, Run.Val['DELTA']
+
+def Monte_Carlo(Files, Uncertainty, N=1000, Seed=0, Percentiles=(10, 50, 90), Batch=1000, Workers=None, **Params):
+    '''
+    Monte Carlo propagation of the input uncertainty to δ(t).
+
+    Uncertainty maps any of Uncertain_parameters to the standard deviation of its normal
+    distribution, around the value given in Params (or the Master default), e.g.
+    {'MO':0.02, 'TOI':0.5, 'TW':0.3, 'C1':1.5, 'C2':0.005, 'C3':0.1}. TW is a measurement offset
+    of the whole Tw series (°C), around 0. Params are the other Master parameters, kept constant.
+
+    The TAB, WAX and Excel files are parsed once. The N samples are then evaluated in batches of
+    Batch samples as (Batch x time steps) arrays (see Master.Run_samples). Each batch draws from
+    its own stream spawned from np.random.SeedSequence(Seed), so that the same Seed and Batch
+    give the same samples, whether the batches run in this process or over Workers processes.
+
+    Output: Two (2) outputs:
+            [1] dfBands     Dataframe of the δ percentiles (mm) at each time step, one column per
+                            percentile ('P10' for the 10th percentile, i.e. the thinnest 10 %).
+            [2] dfSamples   Dataframe of the drawn parameters of every sample, with its final δ.
+    '''
+    Unknown = set(Uncertainty) - set(Uncertain_parameters)
+    if Unknown:
+        raise ValueError('Unknown uncertain parameters {}, expected any of {}'.format(sorted(Unknown), Uncertain_parameters))
+
+    Defaults = inspect.signature(Master).parameters
+    Means = {
+        PARAM : Params.get(PARAM, Defaults[PARAM].default) if PARAM!='TW' else 0.0
+        for PARAM in Uncertain_parameters
+    }
+    Params = {PARAM : Value for PARAM, Value in Params.items() if PARAM not in Uncertain_parameters}
+
+    ## Excel inputs and TAB/WAX tables are read only once, and shared by all batches :
+    Files = {**Files, 'xlsx' : ccd.Get_File_Inputs(Files['xlsx'],'xlsx')}
+    Tables = Master(Files, Engine='Prepare', **Params).Table
+
+    Sizes = [Batch]*(N//Batch) + ([N%Batch] if N%Batch else [])
+    Seeds = np.random.SeedSequence(Seed).spawn(len(Sizes))
+    Arguments = [[Files]*len(Sizes), [Tables]*len(Sizes), [Params]*len(Sizes), [Means]*len(Sizes), [Uncertainty]*len(Sizes), Seeds, Sizes]
+    if Workers:
+        with concurrent.futures.ProcessPoolExecutor(Workers) as Pool:
+            Results = list(Pool.map(Monte_Carlo_batch, *Arguments))
+    else:
+        Results = list(map(Monte_Carlo_batch, *Arguments))
+
+    DELTA = np.concatenate([Delta for _, Delta in Results])
+    Time = Files['xlsx'].index.values
+    dfBands = pd.DataFrame(
+        {
+            'P{:g}'.format(Percentile) : ccd.round_sig_array(Band, 5)
+            for Percentile, Band in zip(Percentiles, np.percentile(DELTA, Percentiles, axis=0))
+        },
+        index = pd.Index(Time, name='TIME')
+    )
+    dfBands.attrs['Units'] = {'TIME' : 'min', **{col : 'mm' for col in dfBands}}
+
+    dfSamples = pd.DataFrame({
+        PARAM : np.concatenate([Draws[PARAM] for Draws, _ in Results]) for PARAM in Uncertain_parameters
+    })
+    dfSamples['DELTA'] = ccd.round_sig_array(DELTA[:,-1], 5)
+    Unit = {**ccd.Abbreviations('UnitL1'), 'TW' : '°C', 'DELTA' : 'mm'}
+    dfSamples.attrs['Units'] = {col : Unit.get(col, '') for col in dfSamples}
+    return dfBands, dfSamples
+
+def Replay(Files, **Params):
+    '''
+    Replays the Excel input dataset of Files as a live feed, one sample at a time through
+    Master.Update (Engine='Prepare'), e.g. to test the online mode against the 'Loop' engine.
+
+    Output: dfOutputs dataframe of all updates, as in Master.
+    '''
+    dfFeed = ccd.Get_File_Inputs(Files['xlsx'],'xlsx')
+    Online = Master({col : Files[col] for col in Files if col!='xlsx'}, Engine='Prepare', **Params)
+    Steps = [
+        Online.Update(Time, TW, DW, DT_DR)
+        for Time, TW, DW, DT_DR in zip(
+            dfFeed.index.values, dfFeed['Tw'].values, dfFeed['dw'].values, dfFeed['dT/dr'].values
+        )
+    ]
+    Symbol = ccd.Abbreviations('SymbolL1')
+    return ccd.Outputs_Frame(
+        {col : np.array([Step[col] for Step in Steps], dtype=np.float64) for col in Symbol},
+        Symbol, ccd.Abbreviations('UnitL1'), dfFeed.index.values
+    )
+
+def Segments(Files, Time, TW, DW, DT_DR, P, **Params):
+    '''
+    δ(x, t) of a pipeline split in segments along its length, see Master.Run_segments for the
+    inputs. Params are the other Master parameters, shared by all segments (di and mo may also be
+    given per segment as (segments x 1) arrays).
+
+    Output: Dataframe of δ (mm, rounded as in dfOutputs) with one row per time step and one column
+            per segment. For every output of every segment, use Master.Run_segments directly.
+    '''
+    Run = Master(Files, Engine='Prepare', **Params)
+    Run.Run_segments(Time, TW, DW, DT_DR, P)
+    dfDelta = pd.DataFrame(
+        ccd.round_sig_array(Run.Val['DELTA'].T, 5),
+        index = pd.Index(Time, name='TIME'),
+        columns = pd.RangeIndex(Run.Val['DELTA'].shape[0], name='Segment')
+    )
+    dfDelta.attrs['Units'] = {'TIME' : 'min', 'DELTA' : 'mm'}
+    return dfDelta
+
+def Adaptive(Files, Time=None, TW=None, DW=None, DT_DR=None, Output=None, Atol=1E-6, Rtol=1E-6, Max_step=None, **Params):
+    '''
+    δ(t) with error-controlled time steps, see Master.Run_adaptive for the inputs. Without Time,
+    the Excel input dataset of Files is used. Params are the other Master parameters.
+
+    Output: Two (2) outputs:
+            [1] dfOutputs   Dataframe of all outputs at the Output times, as in Master.
+            [2] Integrator  Dictionary of the step count and error estimate, see Master.Run_adaptive.
+    '''
+    Run = Master(Files, Engine='Prepare', **Params)
+    Integrator = Run.Run_adaptive(Time, TW, DW, DT_DR, Output, Atol=Atol, Rtol=Rtol, Max_step=Max_step)
+    return Run.dfOutputs, Integrator
@@ -1,13 +1,16 @@
 import os
 import math
 import numpy as np
-import pandas as pd
 import CC_DataPrep as ccd
+import CC_Kernels as cck
+
+## Engines of Master, see Master :
+Engines = ['Loop', 'Vector', 'Prepare']
 
 class Master():
 
     def __init__(
-        self, Files, Alpha_input='Alpha w', PIO=101325
+        self, Files, Alpha_input='Alpha w', PIO=101325, Engine='Loop', Tables=None, Export=True
     ): 
 
         '''
@@ -26,7 +29,8 @@ class Master():
                 - Switching between Alpha w and Alpha c
 
             [2] Alpha_W and Alpha_C         
-                - Step by step equations under selected Alpha
+                - Step by step equations under selected Alpha (Calc_alpha_w and Calc_alpha_c),
+                followed by Save_outputs
             
             [3] Flow_switcher
                 - Switching between Laminar and Turbulent flow
@@ -45,31 +49,98 @@ class Master():
                 [3] Inputs excel file input data at given simulation time index.
 
             [7] Save_outputs
-                - Saving outputs in pandas dataframe
-                - Final dataframe will be saved in ./output folder.
+                - Saving outputs in preallocated float64 columns (Outputs)
+                - Final dataframe is built once at the end, with units in dfOutputs.attrs['Units'],
+                and saved in ./output folder.
+
+        Three (3) engines are available through Engine (see Engines) :
+
+            [1] 'Loop'      Iterates over the simulation time index, one time step at a time.
+
+            [2] 'Vector'    Val holds arrays over all time steps (see Get_Val_vector), so Alpha_W
+                            and Alpha_C evaluate every time step at once. Laminar/turbulent,
+                            L > Le and Pr >= 5 branches are selected per time step by
+                            Flow_switcher_vector.
+
+            [3] 'Prepare'   Only prepares the run, and calculates nothing. The run is then left
+                            to Iter_steps, which yields the 'Loop' engine time steps one at a time,
+                            or to CC_Master_Coupled, which reads the input series from
+                            Get_Val_vector and calls Calc_alpha_w and Calc_alpha_c.
+
+        Tables takes the Table dictionary of a previous Master, so that the TAB file is not loaded
+        again. With Export=False, dfOutputs is not saved in ./output folder (see CC_Batch).
             
         '''
+        if Engine not in Engines:
+            raise ValueError('Unknown Engine {!r}, expected one of {}'.format(Engine, Engines))
+
         ## Converting the user defined input file names as instance variable list :
         self.Files = Files
 
         ## Reading from the TAB and excel files :
+        self.Table = {} if Tables is None else dict(Tables)
         self.Get_Inputs()
 
-        ## Creating dfOutput empty dataframe :
-        self.dfOutputs = pd.DataFrame()
+        ## Creating Outputs empty dictionary of output columns :
+        self.Outputs = {}
 
         ## Initiating Val dictionary key and value :
         self.Val = {'PIO':PIO}
+        self.Engine = Engine
+
+        self.Alpha_input = Alpha_input
 
-        ## Starting the iterative calculation :
-        for Iteration, Time in enumerate(self.dfInputs.index.values):
-            self.Val['Iteration'] = Iteration + 1
-            self.Val['TIME'] = Time
-            self.Get_Val()
+        if Engine=='Vector':
+            ## Calculation of all time steps at once :
+            self.Get_Val_vector()
             self.Alpha_switcher(Alpha_input)
+            self.Build_outputs(len(self.dfInputs))
+        elif Engine=='Loop':
+            ## Starting the iterative calculation :
+            for Step in self.Iter_steps():
+                pass
+        else:
+            return
 
-        self.dfOutputs.index.name = 'TIME'
-        self.dfOutputs.to_excel('./output/Output DF Level 2 {}.xlsx'.format(Alpha_input))
+        if Export:
+            ccd.With_units(self.dfOutputs).to_excel('./output/Output DF Level 2 {}.xlsx'.format(Alpha_input))
+
+    def Iter_steps(self, Stop=None):
+        '''
+        Generator of the 'Loop' engine, yielding the outputs of each time step as soon as it is
+        calculated: dictionary that maps the output abbreviations of the selected Alpha to their
+        values. With Engine='Prepare', nothing is calculated by __init__, and the caller iterates
+        over Iter_steps itself.
+
+        Stop is an optional function of the step outputs, ending the run after the first step
+        where it returns True. Once the run ends (or the caller stops iterating), dfOutputs holds
+        the calculated time steps.
+        '''
+        Symbol, _ = self.Abbreviations(self.Alpha_input)
+        Iteration = 0
+        try:
+            for Iteration, Time in enumerate(self.dfInputs.index.values, start=1):
+                self.Val['Iteration'] = Iteration
+                self.Val['TIME'] = Time
+                self.Get_Val()
+                self.Alpha_switcher(self.Alpha_input)
+                Step = {col : self.Val[col] for col in Symbol}
+                yield Step
+                if Stop is not None and Stop(Step):
+                    break
+        finally:
+            self.Build_outputs(Iteration)
+
+    def Build_outputs(self, Steps):
+        ## Building dfOutputs dataframe from Outputs columns of the first Steps time steps :
+        Symbol, Unit = self.Abbreviations(self.Alpha_input)
+        Outputs = {}
+        for col in Symbol:
+            Value = self.Outputs.get(col, np.nan)
+            Outputs[col] = Value[:Steps] if np.ndim(Value) else Value
+        self.dfOutputs = ccd.Outputs_Frame(
+            Outputs, Symbol, Unit, self.dfInputs.index.values[:Steps]
+        )
 
     
     def Alpha_switcher(self, alpha_input):
@@ -81,8 +152,16 @@ class Master():
             self.Alpha_C()
     
     def Alpha_W(self):
+        self.Calc_alpha_w()
+        self.Save_outputs('Alpha w')
+
+    def Alpha_C(self):
+        self.Calc_alpha_c()
+        self.Save_outputs('Alpha c')
+
+    def Calc_alpha_w(self):
 
-        self.Val['DH'] = self.Val['DI'] if self.Val['TIME']==0 else self.Val['DW']
+        self.Val['DH'] = self.Calc('DH')(self.Val['TIME'], self.Val['DI'], self.Val['DW'])
         self.Val['UO/UOW'] = self.Calc('UO/UOW')(self.Val['UO'],self.Val['UOW'])
         self.Val['VO'] = self.Calc('V')(self.Val['MO'],self.Val['RHOO'],self.Val['DH'])
         self.Val['RE'] = self.Calc('RE')(self.Val['RHOOW'], self.Val['VO'], self.Val['DH'], self.Val['UOW'])
@@ -91,9 +170,8 @@ class Master():
         self.Flow_switcher()
         self.Val['NUD'] = self.Val['NUFD']*(self.Val['UO/UOW']**0.11)
         self.Val['ALPHA W'] = self.Calc('ALPHA')(self.Val['NUD'], self.Val['DH'], self.Val['KOW'])
-        self.Save_outputs('Alpha w')
 
-    def Alpha_C(self):
+    def Calc_alpha_c(self):
 
         self.Val['DH'] = self.Val['DO']
         self.Val['VC'] = self.Calc('V')(self.Val['MC'],self.Val['RHOC'],self.Val['DH'])
@@ -103,11 +181,14 @@ class Master():
         self.Flow_switcher()
         self.Val['NUD'] = self.Val['NUFD']
         self.Val['ALPHA C'] = self.Calc('ALPHA')(self.Val['NUD'], self.Val['DH'], self.Val['KC'])
-        self.Save_outputs('Alpha c')
 
     def Flow_switcher(self):
 
-        if self.Val['RE']<=2300:
+        ## Arrays of Re (vector engine, coupled solver) switch with np.where masks :
+        if np.ndim(self.Val['RE']):
+            self.Flow_switcher_vector()
+
+        elif self.Val['RE']<=2300:
             self.Val['LE'] = self.Calc('LE')(self.Val['RE'], self.Val['DH'])
             Multiplier = self.Val['RE']*self.Val['PR']/self.Val['L/DH']
             if self.Val['L']>self.Val['LE']:
@@ -129,36 +210,47 @@ class Master():
                 self.Val['NUFD'] = self.Val['NUFD1']*(2/(self.Val['L/DH']**(2/3)))
 
 
-    def Calc(self, func):
+    def Flow_switcher_vector(self):
+        '''
+        Same equations as Flow_switcher, for arrays over all time steps, see CC_Kernels.Nusselt
+        (compiled when Numba is available). fo and NuFD,1 are only defined for turbulent flow,
+        and are NaN for laminar time steps.
+        '''
+        self.Val['LE'] = self.Calc('LE')(self.Val['RE'], self.Val['DH'])
+        self.Val['F'], self.Val['NUFD1'], self.Val['NUFD'] = cck.Nusselt(
+            self.Val['RE'], self.Val['PR'], self.Val['L/DH'], self.Val['L'], self.Val['LE']
+        )
+
+    ## Equations are defined once for the class, and are safe for both scalars and arrays :
+    Equations = {
+        'DH' : lambda time,di,dw: np.where(time==0, di, dw),
+        'UO/UOW' : lambda uo,uow: uo/uow,
+        'V' : lambda m,rho,dw: (m / rho)/(math.pi*(dw/2)**2),
+        'RE' : lambda rho,v,dh,u: rho*v*dh/u,
+        'PR' : lambda u,cp,k: u*cp/k,
+        'L/DH' : lambda L,dh: L/dh,
+        'F' : lambda re: (0.79*np.log(re)-1.64)**(-2),
+        'NUFD1' : lambda f,re,pr: ((f/8)*(re-1000)*pr)/(1+12.7*((f/8)**0.5)*((pr**(2/3))-1)),
+        'LE' : lambda re,dh: 0.06*re*dh,
+        'ALPHA' : lambda nud,dh,k: nud*k/dh
+    }
 
-        switcher = {
-            'UO/UOW' : lambda uo,uow: uo/uow,
-            'V' : lambda m,rho,dw: (m / rho)/(math.pi*(dw/2)**2),
-            'RE' : lambda rho,v,dh,u: rho*v*dh/u,
-            'PR' : lambda u,cp,k: u*cp/k,
-            'L/DH' : lambda L,dh: L/dh,
-            'F' : lambda re: (0.79*math.log(re)-1.64)**(-2),
-            'NUFD1' : lambda f,re,pr: ((f/8)*(re-1000)*pr)/(1+12.7*((f/8)**0.5)*((pr**(2/3))-1)),
-            'LE' : lambda re,dh: 0.06*re*dh,
-            'ALPHA' : lambda nud,dh,k: nud*k/dh
-        }
-        return switcher.get(func, '-')
+    def Calc(self, func):
+        return self.Equations.get(func, '-')
 
     def Get_Inputs(self):
         
-        P, TEMP, Properties = ccd.Get_File_Inputs(self.Files['tab'],'tab')
-        self.Table = {
-            'P':P,
-            'TEMP':TEMP,
-            'Properties':Properties
-        }
+        if not self.Table:
+            P, TEMP, Properties = ccd.Get_File_Inputs(self.Files['tab'],'tab')
+            self.Table = {
+                'P':P,
+                'TEMP':TEMP,
+                'Properties':Properties
+            }
         self.dfInputs = ccd.Get_File_Inputs(self.Files['Inputs.xlsx'],'xlsx')
         dfCoolant = ccd.Get_File_Inputs(self.Files['Coolant.xlsx'],'xlsx')
         self.Coolant = {
-            col :{
-                i : dfCoolant.loc[i,col]
-                for i in dfCoolant.index
-            }
+            col : dfCoolant[col].to_numpy(dtype=np.float64)
             for col in dfCoolant.columns
         }
 
@@ -187,20 +279,54 @@ class Master():
                 self.Val['TC Index'], self.Coolant[Var]
             )
     
-    def Save_outputs(self, alpha_input):
+    def Get_Val_vector(self):
+        '''
+        Same as Get_Val, acquiring each variable as an array over all time steps :
+            [1] Inputs excel file columns.
+            [2] TAB properties at To and Tw, with one Get_Properties call each.
+            [3] Coolant properties at Tc.
+        '''
+        self.Val['TIME'] = self.dfInputs.index.values
+        for Var in self.dfInputs.columns:
+            self.Val[Var] = self.dfInputs[Var].to_numpy(dtype=np.float64)
+
+        self.Val['UO'], self.Val['RHOO'] = ccd.Get_Properties(
+            self.Val['PIO'], self.Val['TO'], self.Table['P'], self.Table['TEMP'],
+            self.Table['Properties'], ['UOW','RHOOW']
+        ).T
+
+        self.Val['UOW'], self.Val['RHOOW'], self.Val['CPOW'], self.Val['KOW'] = ccd.Get_Properties(
+            self.Val['PIO'], self.Val['TW'], self.Table['P'], self.Table['TEMP'],
+            self.Table['Properties'], ['UOW','RHOOW','CPOW','KOW']
+        ).T
+
+        TC_Index, _ = ccd.P_TEMP_Indices(self.Coolant['TEMP'], self.Val['TC'])
+        for Var in ['RHOC', 'UC', 'CPC', 'KC']:
+            self.Val[Var] = ccd.Interp_Line(self.Coolant[Var], TC_Index)
+
+    def Abbreviations(self, alpha_input):
         switcher = {
             'Alpha w': {'Unit':'UnitL2Aw', 'Symbol':'SymbolL2Aw'},
             'Alpha c': {'Unit':'UnitL2Ac', 'Symbol':'SymbolL2Ac'}
         }
-
-        Unit = ccd.Abbreviations(switcher[alpha_input]['Unit'])
         Symbol = ccd.Abbreviations(switcher[alpha_input]['Symbol'])
+        Unit = ccd.Abbreviations(switcher[alpha_input]['Unit'])
+        return Symbol, Unit
 
-        for col in Symbol.keys():
-            if self.Val['Iteration']==1:
-                self.dfOutputs.loc['min', Symbol[col]] = Unit[col]
-            self.dfOutputs.loc[self.Val['TIME'], Symbol[col]] = ccd.round_sig(self.Val[col],5)
+    def Save_outputs(self, alpha_input):
+        Symbol, _ = self.Abbreviations(alpha_input)
 
+        ## Every output column of the vector engine is already a full array (or a constant) :
+        if self.Engine=='Vector':
+            self.Outputs = {col : self.Val[col] for col in Symbol.keys()}
+            return
+
+        ## Preallocating one float64 column per output variable, sized from dfInputs :
+        if self.Val['Iteration']==1:
+            self.Outputs = {col : np.full(len(self.dfInputs), np.nan) for col in Symbol.keys()}
+
+        for col in Symbol.keys():
+            self.Outputs[col][self.Val['Iteration']-1] = self.Val[col]
 
 if __name__ == '__main__':
     
@@ -0,0 +1,40 @@
+import time
+import CC_AppJobs as ccj
+
+def Wait(JobID, Timeout=30):
+    Start = time.time()
+    while ccj.Status(JobID)['State'] in ['Queued', 'Running']:
+        assert time.time()-Start<Timeout
+        time.sleep(0.05)
+
+def test_status_of_finished_job_can_be_read_twice():
+    JobID = ccj.Submit(sum, [1, 2, 3])
+    Wait(JobID)
+    First, Second = ccj.Status(JobID), ccj.Status(JobID)
+    assert First['State']==Second['State']=='Done'
+    assert First['Result']==Second['Result']==6
+    assert ccj.Get_result(JobID)==6
+    assert JobID not in ccj.Jobs
+
+def test_failed_job_keeps_its_error():
+    JobID = ccj.Submit(int, 'x')
+    Wait(JobID)
+    assert ccj.Status(JobID)['State']==ccj.Status(JobID)['State']=='Failed'
+    assert 'ValueError' in ccj.Status(JobID)['Error']
+
+def test_unpolled_finished_jobs_leave_jobs():
+    JobID = ccj.Submit(sum, [1])
+    ccj.Jobs[JobID]['Future'].result(timeout=30)
+    ccj.Collect_jobs()
+    assert JobID not in ccj.Jobs
+    assert ccj.Get_result(JobID)==1
+
+def test_expiry_only_cancels_queued_jobs(monkeypatch):
+    ## Each worker takes one job, and the pool queues Workers+1 more as already running :
+    JobIDs = [ccj.Submit(time.sleep, 1) for _ in range(2*ccj.Workers+3)]
+    monkeypatch.setattr(ccj, 'Job_expiry', 0)
+    ccj.Collect_jobs()
+    assert ccj.Status(JobIDs[0])['State']=='Running'
+    assert ccj.Status(JobIDs[-1])['State']==ccj.Status(JobIDs[-1])['State']=='Expired'
+    Wait(JobIDs[0])
+    assert ccj.Status(JobIDs[0])['State']=='Done'
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+from scipy.interpolate import griddata
+import CC_DataPrep as ccd
+import CC_Kernels as cck
+
+Files = {
+    'tab':'./Files/Dead Oil - Dulang 44 to 35C - OLGA tab - fixed format.tab',
+    'wax':'./Files/Dead Oil - DULANG 44 to 35C - OLGA WAX.wax'
+}
+
+@pytest.mark.parametrize('Use_numba', [False, True])
+def test_non_finite_values_are_outside_the_table(monkeypatch, Use_numba):
+    monkeypatch.setattr(cck, 'Use_numba', Use_numba and cck.numba is not None)
+    P, TEMP, Properties = ccd.Get_File_Inputs(Files['tab'], 'tab', False)
+    for Value in [np.nan, np.inf]:
+        with pytest.raises(ValueError, match='outside the table range'):
+            ccd.P_TEMP_Index(TEMP, Value)
+        with pytest.raises(ValueError, match='outside the table range'):
+            ccd.Get_Properties(P[0], [TEMP[0], Value], P, TEMP, Properties, ['UOW'])
+        with pytest.raises(ValueError, match='outside the table range'):
+            ccd.Interp_Cells(Properties['UOW'], [0.5], [Value])
+
+def Griddata_cell(PropertyTable, PIndex, TIndex):
+    ## Interpolation of the four cell corners with griddata, as before Interp_Cell :
+    Corners = [(P, T) for P in [np.floor(PIndex), np.ceil(PIndex)] for T in [np.floor(TIndex), np.ceil(TIndex)]]
+    Values = [PropertyTable[int(P), int(T)] for P, T in Corners]
+    return griddata(Corners, Values, [PIndex, TIndex], method='linear')[0]
+
+@pytest.mark.parametrize('filetype, PROP', [('tab','UOW'), ('wax','MWWW')])
+def test_interp_cell_matches_griddata(filetype, PROP):
+    Table = ccd.Get_File_Inputs(Files[filetype], filetype, False)[2][PROP]
+    Rng = np.random.default_rng(0)
+    PIndex = Rng.uniform(0, Table.shape[0]-1, 200)
+    TIndex = Rng.uniform(0, Table.shape[1]-1, 200)
+    Reference = np.array([Griddata_cell(Table, p, t) for p, t in zip(PIndex, TIndex)])
+    Scalar = np.array([ccd.Interp_Cell(Table, p, t) for p, t in zip(PIndex, TIndex)])
+    assert np.allclose(Scalar, Reference, rtol=1E-12, atol=0)
+    assert np.allclose(ccd.Interp_Cells(Table, PIndex, TIndex), Reference, rtol=1E-12, atol=0)
+
+def test_get_properties_matches_get_property():
+    Rng = np.random.default_rng(0)
+    for filetype, Names in [('tab', ['RHOOW','UOW','CPOW','KOW']), ('wax', ['MWWW','MWOW','RHOWW'])]:
+        P_Table, TEMP_Table, Properties = ccd.Get_File_Inputs(Files[filetype], filetype, False)
+        ## Random points, and points on the table axes where P_TEMP_Index is exact :
+        P = np.concatenate([Rng.uniform(P_Table[0], P_Table[-1], 50), P_Table[[0, 1, -1]]])
+        TEMP = np.concatenate([Rng.uniform(TEMP_Table[0], TEMP_Table[-1], 50), TEMP_Table[[0, 7, -1]]])
+        P, TEMP = [X.ravel() for X in np.meshgrid(P, TEMP)]
+        Reference = np.array([
+            [
+                ccd.Get_Property(ccd.P_TEMP_Index(P_Table, p), ccd.P_TEMP_Index(TEMP_Table, t), Properties[Name])
+                for Name in Names
+            ]
+            for p, t in zip(P, TEMP)
+        ])
+        Batch = ccd.Get_Properties(P, TEMP, P_Table, TEMP_Table, Properties, Names)
+        assert np.allclose(Batch, Reference, rtol=1E-12, atol=0), filetype
+
+def Assert_same_tables(Tables, Reference):
+    for X, Y in zip(Tables[:2], Reference[:2]):
+        assert np.array_equal(X, Y)
+    assert Tables[2].keys()==Reference[2].keys()
+    for PROP in Reference[2]:
+        assert np.array_equal(Tables[2][PROP], Reference[2][PROP])
+
+@pytest.mark.parametrize('Mmap', [False, True])
+def test_unwritable_cache_folder_falls_back_to_parsing(monkeypatch, Mmap):
+    monkeypatch.setattr(ccd, 'Cache_folder', '/dev/null/cache')
+    Reference = ccd.Get_File_Inputs(Files['tab'], 'tab', False)
+    Assert_same_tables(ccd.Get_File_Inputs(Files['tab'], 'tab', True, Mmap), Reference)
+
+@pytest.mark.parametrize('Mmap', [False, True])
+def test_corrupt_cache_file_is_replaced(monkeypatch, tmp_path, Mmap):
+    monkeypatch.setattr(ccd, 'Cache_folder', str(tmp_path))
+    Reference = ccd.Get_File_Inputs(Files['wax'], 'wax', False)
+    CachePath = ccd.Cache_Path(Files['wax'], 'wax')
+    ccd.Get_File_Inputs(Files['wax'], 'wax')
+    with open(CachePath, 'rb') as f:
+        Content = f.read()
+    for Corrupt in [Content[:len(Content)//2], b'not a cache file']:
+        with open(CachePath, 'wb') as f:
+            f.write(Corrupt)
+        Assert_same_tables(ccd.Get_File_Inputs(Files['wax'], 'wax', True, Mmap), Reference)
+        ## The parsed tables are cached again :
+        Assert_same_tables(ccd.Load_Cache(CachePath), Reference)
+
+def test_wax_dimensions_come_from_the_header():
+    TextLines = ccd.LoadTextFiles(Files['wax'])
+    Pointer = [i for i, Line in enumerate(TextLines) if '!Pressure Point No.' in Line]
+    Header = [i for i, Line in enumerate(TextLines) if '!Number of P Points' in Line][0]
+    ## Single pressure point file :
+    TextLines = TextLines[:Pointer[1]]
+    TextLines[Header+1] = ' 1 30\n'
+    P, TEMP, Properties = ccd.Get_Upload_Inputs(''.join(TextLines).encode('utf-8'), 'wax')
+    assert P.shape==(1,) and TEMP.shape==(30,)
+    assert Properties['RHOWW'].shape==(1, 30) and Properties['CWAX'].shape==(1, 30, 47)
+    ## More pressure points in the header than in the file :
+    TextLines[Header+1] = ' 2 30\n'
+    with pytest.raises(ValueError, match='pressure points'):
+        ccd.Get_Upload_Inputs(''.join(TextLines).encode('utf-8'), 'wax')
+
+def test_round_sig_array_matches_round_sig():
+    Rng = np.random.default_rng(0)
+    x = np.concatenate([
+        Rng.uniform(-1, 1, 500) * 10.0**Rng.integers(-12, 8, 500),
+        [0.0, 0.5, 1.0, 125.0, -0.00125, 99999.5, np.inf, np.nan]
+    ])
+    Reference = np.array([ccd.round_sig(v, 5) for v in x])
+    assert np.array_equal(ccd.round_sig_array(x, 5), Reference, equal_nan=True)
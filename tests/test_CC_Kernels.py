@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+import CC_DataPrep as ccd
+import CC_Kernels as cck
+
+pytest.importorskip('numba')
+
+def Both(monkeypatch, func, *args):
+    ## Outputs of func compiled with Numba, then with the NumPy fallback :
+    monkeypatch.setattr(cck, 'Use_numba', True)
+    Compiled = func(*args)
+    monkeypatch.setattr(cck, 'Use_numba', False)
+    return Compiled, func(*args)
+
+def test_interp_cells_numba_matches_numpy(monkeypatch):
+    Table = ccd.Get_File_Inputs('./Files/Dead Oil - Dulang 44 to 35C - OLGA tab - fixed format.tab', 'tab', False)[2]['UOW']
+    Rng = np.random.default_rng(0)
+    ## Random points, and points on the last row and column of the table :
+    PIndex = np.concatenate([Rng.uniform(0, 49, 1000), [49.0, 49.0, 12.5]])
+    TIndex = np.concatenate([Rng.uniform(0, 49, 1000), [49.0, 3.25, 49.0]])
+    Compiled, Fallback = Both(monkeypatch, cck.Interp_Cells, Table, PIndex, TIndex)
+    assert np.allclose(Compiled, Fallback, rtol=1E-12, atol=0)
+
+def test_nusselt_numba_matches_numpy(monkeypatch):
+    Rng = np.random.default_rng(0)
+    ## Laminar and turbulent flow, L above and below Le, Pr above and below 5, L/dh above and below 60 :
+    RE, PR, L_DH = Rng.uniform(500, 50000, 1000), Rng.uniform(1, 50, 1000), Rng.uniform(10, 200, 1000)
+    L, LE = Rng.uniform(0.1, 3, 1000), 0.06*RE*0.01
+    Laminar = RE<=2300
+    assert (Laminar & (L>LE)).any() and (Laminar & (L<=LE) & (PR>=5)).any() and (Laminar & (L<=LE) & (PR<5)).any()
+    Compiled, Fallback = Both(monkeypatch, cck.Nusselt, RE, PR, L_DH, L, LE)
+    for X, Y in zip(Compiled, Fallback):
+        assert np.allclose(X, Y, rtol=1E-12, atol=0, equal_nan=True)
@@ -0,0 +1,17 @@
+import numpy as np
+import CC_DataPrep as ccd
+import CC_Master_Coupled as ccmc
+
+Files = {
+    'tab':'./Files/Dead Oil - Dulang 44 to 35C - OLGA tab - fixed format.tab',
+    'wax':'./Files/Dead Oil - DULANG 44 to 35C - OLGA WAX.wax',
+    'Inputs.xlsx':'./Files/Dataset Level 2 Inputs.xlsx',
+    'Coolant.xlsx':'./Files/Dataset Level 2 Coolant.xlsx'
+}
+
+def test_delta_follows_the_level_2_sampling():
+    dfInputs = ccd.Get_File_Inputs(Files['Inputs.xlsx'], 'xlsx')
+    Every_10 = ccmc.Master(Files)
+    Every_20 = ccmc.Master({**Files, 'Inputs.xlsx':dfInputs.iloc[::2]})
+    assert np.array_equal(Every_20.DT[1:], np.full(len(Every_20.DT)-1, 1200.0))
+    assert np.isclose(Every_20.dfOutputs['δ'].iloc[-1], Every_10.dfOutputs['δ'].iloc[-1], rtol=0.05)
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+import CC_DataPrep as ccd
+import CC_Master_L1 as ccm1
+
+Files = {
+    'tab':'./Files/Dead Oil - Dulang 44 to 35C - OLGA tab - fixed format.tab',
+    'wax':'./Files/Dead Oil - DULANG 44 to 35C - OLGA WAX.wax',
+    'xlsx':'./Files/Dataset Level 1.xlsx'
+}
+
+def test_iter_steps_restarts_from_the_first_time_step():
+    Loop = ccm1.Master(Files)
+    Run = ccm1.Master(Files, Engine='Prepare')
+    First = [Step['DELTA'] for Step in Run.Iter_steps()]
+    pd.testing.assert_frame_equal(Run.dfOutputs, Loop.dfOutputs)
+    Second = [Step['DELTA'] for Step in Run.Iter_steps()]
+    assert First==Second
+    pd.testing.assert_frame_equal(Run.dfOutputs, Loop.dfOutputs)
+
+@pytest.mark.parametrize('DowMethod', ['Wilke-Chang', 'Hayduk-Minhass'])
+def test_vector_engine_matches_loop_engine(DowMethod):
+    ## Bundled dataset repeated 3 times, for δ well beyond the first 300 min :
+    dfInputs = ccd.Get_File_Inputs(Files['xlsx'], 'xlsx')
+    dfLong = pd.concat([dfInputs]*3, ignore_index=True)
+    dfLong.index = pd.Index(dfLong.index*10, name=dfInputs.index.name)
+    Loop = ccm1.Master({**Files, 'xlsx':dfLong}, DowMethod=DowMethod, Engine='Loop')
+    Vector = ccm1.Master({**Files, 'xlsx':dfLong}, DowMethod=DowMethod, Engine='Vector')
+    pd.testing.assert_frame_equal(Vector.dfOutputs, Loop.dfOutputs)
+
+def test_unknown_engine_is_rejected():
+    with pytest.raises(ValueError, match='Unknown Engine'):
+        ccm1.Master(Files, Engine='vector')
+
+def test_replay_of_the_online_mode_matches_the_engines():
+    dfReplay = ccm1.Replay(Files)
+    pd.testing.assert_frame_equal(dfReplay, ccm1.Master(Files, Engine='Vector').dfOutputs)
+    pd.testing.assert_frame_equal(dfReplay, ccm1.Master(Files, Engine='Loop').dfOutputs)
+
+def test_segments_match_one_master_per_segment():
+    dfInputs = ccd.Get_File_Inputs(Files['xlsx'], 'xlsx')
+    X = np.linspace(0, 1, 5)[:,np.newaxis]
+    TW = dfInputs['Tw'].to_numpy()[np.newaxis,:] - 2*X
+    DT_DR = dfInputs['dT/dr'].to_numpy()[np.newaxis,:] * (1-0.3*X)
+    P = np.linspace(3*101325, 101325, 5)
+    dfDelta = ccm1.Segments(
+        {'tab':Files['tab'], 'wax':Files['wax']}, dfInputs.index.values, TW, dfInputs['dw'].to_numpy(), DT_DR, P
+    )
+    for i in range(len(P)):
+        Segment = ccm1.Master(
+            {**Files, 'xlsx':pd.DataFrame({'Tw':TW[i], 'dw':dfInputs['dw'], 'dT/dr':DT_DR[i]})},
+            PIO=P[i], Engine='Vector'
+        )
+        assert np.array_equal(dfDelta[i].to_numpy(), Segment.dfOutputs['δ'].to_numpy())
+
+def test_calibrate_starts_from_a_zero_constant():
+    Run = ccm1.Master(Files, Engine='Vector', C2=0.07)
+    Measured = pd.Series(Run.Val['DELTA'], index=Run.dfInputs.index)
+    Fitted, _ = ccm1.Calibrate(Files, Measured, Fit=('C2',), C2=0)
+    assert Fitted['Success'] and np.isclose(Fitted['C2'], 0.07, rtol=1E-6)